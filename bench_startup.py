@@ -0,0 +1,103 @@
+"""
+Benchmark cold-start untuk entry point controller.
+
+Setiap target dijalankan di interpreter baru (cold start), diukur dari proses
+dimulai sampai jendela pertama selesai digambar (GUI) atau modul siap dipakai
+(daemon). Hasil dibandingkan dengan budget; exit code 1 jika ada yang lewat.
+Juga dicek bahwa pyserial belum ter-import saat startup (harus lazy).
+
+Contoh:
+    python bench_startup.py
+    python bench_startup.py --runs 10 --budget-scale 1.5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Budget cold-start per target (milidetik), termasuk start interpreter
+BUDGETS_MS = {
+    "modbus_daemon": 150,
+    "modbus_controller_mige": 600,
+    "modbus_controller_leo": 600,
+    "modbus_controller_mige_new": 600,
+}
+
+# Snippet dijalankan di proses anak; mencetak satu baris JSON hasil ukur
+_PRELUDE = "import sys, time, json; sys.path.insert(0, {here!r})\n"
+
+_SNIPPETS = {
+    "modbus_daemon": "import modbus_daemon\n",
+    "modbus_controller_mige": "import modbus_controller_mige as m\nm.root.update()\nm.root.destroy()\n",
+    "modbus_controller_leo": (
+        "import tkinter as tk\nimport modbus_controller_leo as m\n"
+        "root = tk.Tk()\napp = m.ModbusControllerApp(root)\nroot.update()\nroot.destroy()\n"
+    ),
+    "modbus_controller_mige_new": (
+        "import tkinter as tk\nimport modbus_controller_mige_new as m\n"
+        "root = tk.Tk()\napp = m.ModbusControllerApp(root)\nroot.update()\nroot.destroy()\n"
+    ),
+}
+
+_REPORT = "print(json.dumps({'serial_loaded': 'serial' in sys.modules, 'tk_loaded': 'tkinter' in sys.modules}))\n"
+
+
+def has_display():
+    return sys.platform.startswith("win") or sys.platform == "darwin" or bool(os.environ.get("DISPLAY"))
+
+
+def run_once(name):
+    """Menjalankan satu cold start dan mengembalikan (ms, info)."""
+    code = _PRELUDE.format(here=HERE) + _SNIPPETS[name] + _REPORT
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=HERE)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else "gagal")
+    info = json.loads(result.stdout.strip().splitlines()[-1])
+    return elapsed_ms, info
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark cold-start controller Modbus.")
+    parser.add_argument("--runs", type=int, default=5, help="Jumlah cold start per target")
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="Pengali budget (mesin lambat)")
+    parser.add_argument("targets", nargs="*", default=list(BUDGETS_MS), help="Target yang diukur")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for name in args.targets:
+        if name != "modbus_daemon" and not has_display():
+            print(f"{name:28s} dilewati (tidak ada DISPLAY)")
+            continue
+
+        times = []
+        info = {}
+        for _ in range(args.runs):
+            elapsed_ms, info = run_once(name)
+            times.append(elapsed_ms)
+
+        budget = BUDGETS_MS[name] * args.budget_scale
+        median = statistics.median(times)
+        notes = []
+        if median > budget:
+            notes.append("melebihi budget")
+        if info.get("serial_loaded"):
+            notes.append("pyserial ter-import saat startup")
+        if name == "modbus_daemon" and info.get("tk_loaded"):
+            notes.append("tkinter ter-import")
+        ok = not notes
+        failed |= not ok
+        print(f"{name:28s} median {median:7.1f} ms  min {min(times):7.1f} ms  "
+              f"budget {budget:6.0f} ms  {'OK' if ok else 'LEWAT'} {'; '.join(notes)}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
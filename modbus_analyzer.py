@@ -0,0 +1,242 @@
+"""
+Analisa anomali bus pada aliran transaksi hasil decode capture.
+
+Satu kali jalan (online), state O(1) per slave/register, mendeteksi:
+
+    no_response      request tanpa respons
+    exception        respons exception Modbus
+    latency_outlier  latensi jauh di atas baseline bergulir (EWMA) untuk register itu
+    poll_gap         jeda polling jauh di atas periode normal register itu
+    retry_storm      request baca identik diulang setelah tidak dijawab (retry master)
+    repeated_write   perintah tulis (FC05/06/0F/10) identik berulang beruntun
+    crc_error        frame dengan CRC salah
+    error_burst      banyak parity/framing error dalam jendela waktu pendek
+
+Kejadian yang sama dan berdekatan digabung menjadi satu insiden, lalu
+insiden diurutkan berdasarkan skor.
+
+Contoh:
+    python modbus_analyzer.py data-modbus-lincnc.csv
+    python modbus_analyzer.py capture-harian.csv --top 50 --baud 38400
+"""
+import argparse
+import math
+import sys
+
+import modbus_capture
+
+WRITE_FUNCTIONS = (0x05, 0x06, 0x0F, 0x10)
+
+# Bobot dasar skor per jenis kejadian
+SEVERITY = {
+    "exception": 5.0,
+    "no_response": 4.0,
+    "crc_error": 3.0,
+    "error_burst": 3.0,
+    "retry_storm": 2.0,
+    "repeated_write": 2.0,
+    "latency_outlier": 2.0,
+    "poll_gap": 1.0,
+}
+
+
+class Incident:
+    """Satu insiden gabungan: jenis + kunci (slave, function, alamat) + rentang waktu."""
+
+    __slots__ = ("kind", "key", "start", "end", "count", "score", "detail")
+
+    def __init__(self, kind, key, time, score, detail):
+        self.kind = kind
+        self.key = key
+        self.start = time
+        self.end = time
+        self.count = 1
+        self.score = score
+        self.detail = detail
+
+    def __str__(self):
+        slave, function, address = self.key
+        where = f"slave {slave} fc {function:02X}" if slave is not None else "bus"
+        if address is not None:
+            where += f" reg 0x{address:04X}"
+        span = f"{self.start:.3f}-{self.end:.3f}s" if self.count > 1 else f"{self.start:.3f}s"
+        return f"[{self.score:7.1f}] {self.kind:15s} {where:28s} x{self.count:<5d} {span}  {self.detail}"
+
+
+class _RegisterState:
+    """State bergulir per (slave, function, alamat)."""
+
+    __slots__ = ("lat_mean", "lat_var", "lat_n", "last_request", "period", "period_n")
+
+    def __init__(self):
+        self.lat_mean = 0.0
+        self.lat_var = 0.0
+        self.lat_n = 0
+        self.last_request = None
+        self.period = 0.0
+        self.period_n = 0
+
+
+class BusAnalyzer:
+    """
+    Analisa online: panggil feed(transaction) untuk setiap transaksi secara
+    berurutan, lalu incidents() untuk daftar insiden terurut.
+    """
+
+    def __init__(self, alpha=0.05, warmup=8, latency_sigma=4.0, min_latency_jump=0.002,
+                 gap_factor=3.0, retry_threshold=3, burst_window=1.0, burst_threshold=3,
+                 merge_window=10.0):
+        self.alpha = alpha
+        self.warmup = warmup
+        self.latency_sigma = latency_sigma
+        self.min_latency_jump = min_latency_jump
+        self.gap_factor = gap_factor
+        self.retry_threshold = retry_threshold
+        self.burst_window = burst_window
+        self.burst_threshold = burst_threshold
+        self.merge_window = merge_window
+
+        self.registers = {}
+        self.last_frame = None
+        self.last_answered = False
+        self.repeat = 0
+        self.burst_start = None
+        self.burst_count = 0
+        self.open = {}
+        self.closed = []
+        self.transactions = 0
+
+    def _emit(self, kind, key, time, weight=1.0, detail=""):
+        score = SEVERITY[kind] * weight
+        incident = self.open.get((kind, key))
+        if incident is not None and time - incident.end <= self.merge_window:
+            incident.end = time
+            incident.count += 1
+            incident.score += score
+            incident.detail = detail or incident.detail
+            return
+        if incident is not None:
+            self.closed.append(incident)
+        self.open[(kind, key)] = Incident(kind, key, time, score, detail)
+
+    def feed(self, tx):
+        self.transactions += 1
+        request, response = tx.request, tx.response
+        data = request.data
+        t = request.start
+        info = modbus_capture.decode_frame(data)
+        key = (info["slave"], info["function"], info.get("address"))
+
+        # --- Error level byte / frame ---
+        for frame in (request, response):
+            if frame is None:
+                continue
+            if frame.errors:
+                self._error_burst(frame.start)
+            if len(frame.data) >= 4 and not modbus_capture.crc_ok(frame.data):
+                self._emit("crc_error", key, frame.start, detail=frame.data.hex().upper())
+
+        if info["kind"] == "invalid":
+            return
+
+        # --- Retry storm / tulis berulang: request identik beruntun ---
+        # Tulis identik selalu dihitung; baca identik hanya jika sebelumnya tidak
+        # dijawab, karena polling normal memang mengulang request yang sama
+        is_write = info["function"] in WRITE_FUNCTIONS
+        if data == self.last_frame and (is_write or not self.last_answered):
+            self.repeat += 1
+            if self.repeat + 1 >= self.retry_threshold:
+                self._emit("repeated_write" if is_write else "retry_storm", key, t,
+                           detail=f"{self.repeat + 1}x {data.hex().upper()}")
+        else:
+            self.last_frame = data
+            self.repeat = 0
+        self.last_answered = response is not None
+
+        state = self.registers.get(key)
+        if state is None:
+            state = self.registers[key] = _RegisterState()
+
+        # --- Poll gap: periode antar request untuk register yang sama ---
+        # Retry beruntun tidak dihitung sebagai periode polling; periode 0 (timestamp
+        # kembar di capture) bukan acuan dan diganti interval berikutnya
+        if state.last_request is not None and self.repeat == 0:
+            interval = t - state.last_request
+            if state.period_n >= self.warmup and state.period > 0 and interval > self.gap_factor * state.period:
+                self._emit("poll_gap", key, t, weight=interval / state.period,
+                           detail=f"jeda {interval:.3f}s, normal {state.period:.3f}s")
+            else:
+                state.period = interval if state.period_n == 0 or state.period <= 0 else (
+                    state.period + self.alpha * (interval - state.period))
+                state.period_n += 1
+        state.last_request = t
+
+        # --- Respons ---
+        if response is None:
+            self._emit("no_response", key, t, detail=data.hex().upper())
+            return
+
+        if response.data[1:2] and response.data[1] & 0x80:
+            code = response.data[2] if len(response.data) > 2 else None
+            self._emit("exception", key, t, detail=f"exception code {code}")
+
+        latency = response.start - request.end
+        if state.lat_n >= self.warmup:
+            std = math.sqrt(state.lat_var)
+            jump = latency - state.lat_mean
+            if jump > self.min_latency_jump and jump > self.latency_sigma * std:
+                z = jump / std if std else self.latency_sigma
+                self._emit("latency_outlier", key, t, weight=min(z / self.latency_sigma, 10.0),
+                           detail=f"{latency * 1000:.2f} ms, baseline {state.lat_mean * 1000:.2f} ms")
+                return  # Outlier tidak ikut menggeser baseline
+        # EWMA mean/variance (Welford eksponensial)
+        if state.lat_n == 0:
+            state.lat_mean = latency
+        else:
+            diff = latency - state.lat_mean
+            incr = self.alpha * diff
+            state.lat_mean += incr
+            state.lat_var = (1 - self.alpha) * (state.lat_var + diff * incr)
+        state.lat_n += 1
+
+    def _error_burst(self, t):
+        if self.burst_start is None or t - self.burst_start > self.burst_window:
+            self.burst_start = t
+            self.burst_count = 0
+        self.burst_count += 1
+        if self.burst_count >= self.burst_threshold:
+            self._emit("error_burst", (None, None, None), t,
+                       detail=f"{self.burst_count} frame error dalam {self.burst_window:.1f}s")
+
+    def incidents(self):
+        """Semua insiden, skor tertinggi lebih dulu."""
+        return sorted(self.closed + list(self.open.values()), key=lambda i: i.score, reverse=True)
+
+
+def analyze_file(path, baudrate=modbus_capture.DEFAULT_BAUDRATE, timeout=1.5, **options):
+    analyzer = BusAnalyzer(**options)
+    for tx in modbus_capture.iter_capture_transactions(path, baudrate, timeout):
+        analyzer.feed(tx)
+    return analyzer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Deteksi anomali bus Modbus dari capture.")
+    parser.add_argument("capture", help="File capture (format data.txt, data-modbus-lincnc.csv, atau journal .mbj)")
+    parser.add_argument("--top", type=int, default=20, help="Jumlah insiden yang ditampilkan")
+    parser.add_argument("--baud", type=int, default=modbus_capture.DEFAULT_BAUDRATE)
+    parser.add_argument("--timeout", type=float, default=1.5, help="Timeout respons (detik)")
+    parser.add_argument("--retry", type=int, default=3, help="Ambang request identik beruntun")
+    args = parser.parse_args(argv)
+
+    analyzer = analyze_file(args.capture, args.baud, args.timeout, retry_threshold=args.retry)
+    incidents = analyzer.incidents()
+    print(f"Hasil Analisa dari file: {args.capture}")
+    print(f"{analyzer.transactions} transaksi, {len(incidents)} insiden\n")
+    for incident in incidents[:args.top]:
+        print(incident)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,451 @@
+"""
+Arsip telemetri register jangka panjang dengan encoding delta + run-length.
+
+Nilai seperti kecepatan 0x0000 atau status enable bisa sama selama berjam-jam,
+jadi setiap stream register (slave, function, alamat) disimpan sebagai
+deretan run: satu run = nilai yang sama untuk n sampel berturut-turut.
+Per run disimpan empat bilangan 32-bit:
+
+    dt     selisih waktu awal run dari awal run sebelumnya (ms)
+    dv     selisih nilai dari run sebelumnya
+    n      jumlah sampel dalam run
+    span   jarak sampel pertama sampai terakhir run (ms)
+
+Run dikumpulkan per chunk (default 10 menit per stream), lalu ditulis dengan
+header berisi rentang waktu chunk dan payload terkompresi zlib. Header chunk
+adalah index waktu: pembaca hanya melompati header (seek) dan mendekode chunk
+yang beririsan dengan rentang yang diminta.
+
+Arsip utama hanya ditambah (append) chunk yang sudah ditutup. Chunk yang
+masih terbuka ditulis setiap `flush_seconds` (default 5 s) ke file
+checkpoint `<arsip>.open` berformat sama, diganti atomik (os.replace).
+Jika proses dibunuh atau crash, checkpoint dipindah ke arsip saat dibuka
+lagi, jadi data yang hilang paling banyak `flush_seconds` terakhir. Chunk
+setengah tertulis di ekor arsip dipotong saat dibuka, dan chunk yang
+payload-nya rusak dilewati saat query. Query hanya membaca arsip utama,
+jadi chunk yang masih terbuka belum terlihat.
+
+Waktu sampel di dalam satu run direkonstruksi merata antara sampel pertama dan
+terakhir run; awal dan akhir run tepat (resolusi 1 ms), jadi galat waktu
+paling besar sebesar jitter polling. Nilai selalu tepat.
+
+Dekode memakai NumPy jika tersedia (np.repeat / np.cumsum, tanpa loop per
+sampel); tanpa NumPy dipakai dekoder Python murni yang menghasilkan list.
+NumPy baru di-import saat dekode pertama, jadi penulis arsip (daemon) tidak
+membayar waktu import-nya.
+
+Contoh:
+    python modbus_daemon.py serve --port /dev/ttyUSB1 --archive /var/lib/spindle.mba
+    python modbus_archive.py info /var/lib/spindle.mba
+    python modbus_archive.py trend /var/lib/spindle.mba --slave 1 --function 4 --address 0x0000 \\
+        --start 2026-10-01 --end 2026-10-19 --bucket 3600
+"""
+import argparse
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from collections import namedtuple
+from datetime import datetime
+from functools import lru_cache
+
+MAGIC = b"MBA1"
+CHUNK_MAGIC = b"MBAC"
+CHECKPOINT_SUFFIX = ".open"
+
+_HEADER = struct.Struct('<4sH')
+# magic, slave, function, alamat, waktu sampel pertama / terakhir (ms), nilai awal, sampel, run, panjang payload
+_CHUNK = struct.Struct('<4sBBHqqiIII')
+
+ChunkInfo = namedtuple("ChunkInfo", "offset slave function address first last base samples runs length")
+
+
+class _Stream:
+    """Run yang sedang dikumpulkan untuk satu register."""
+
+    __slots__ = ("first", "last", "base", "samples", "runs", "run_start", "run_last", "run_value", "run_n",
+                 "prev_start", "prev_value", "dt", "dv", "n", "span")
+
+    def __init__(self):
+        self.runs = 0
+        self.samples = 0
+        self.run_n = 0
+        self.dt = array('i')
+        self.dv = array('i')
+        self.n = array('I')
+        self.span = array('I')
+
+    def close_run(self):
+        self.dt.append(self.run_start - self.prev_start)
+        self.dv.append(self.run_value - self.prev_value)
+        self.n.append(self.run_n)
+        self.span.append(self.run_last - self.run_start)
+        self.prev_start = self.run_start
+        self.prev_value = self.run_value
+        self.runs += 1
+        self.run_n = 0
+
+
+class TelemetryArchive:
+    """
+    Penulis arsip. Aman dipanggil dari beberapa thread.
+
+    Chunk sebuah stream ditutup jika rentangnya mencapai `chunk_seconds` atau
+    jumlah run mencapai `max_runs`; close() menutup semua chunk yang terbuka.
+    Chunk terbuka di-checkpoint ke `<path>.open` paling lama tiap `flush_seconds`.
+    """
+
+    def __init__(self, path, chunk_seconds=600, max_runs=65536, flush_seconds=5.0):
+        self.path = path
+        self.checkpoint_path = path + CHECKPOINT_SUFFIX
+        self.chunk_ms = int(chunk_seconds * 1000)
+        self.max_runs = max_runs
+        self.flush_ms = int(flush_seconds * 1000)
+        self.next_checkpoint = 0
+        self.streams = {}
+        self.lock = threading.Lock()
+        self.file = open(path, 'ab')
+        # Byte ekor yang dibuang saat dibuka (chunk setengah tertulis dari crash)
+        self.discarded = 0
+        # Chunk dari checkpoint proses sebelumnya yang dipindah ke arsip
+        self.recovered = 0
+        if self.file.tell() < _HEADER.size:
+            self.discarded = self.file.tell()
+            self.file.truncate(0)
+            self.file.write(_HEADER.pack(MAGIC, 1))
+            self.file.flush()
+            index = []
+        else:
+            # Chunk baru tidak boleh tertulis di belakang chunk yang terpotong
+            index = read_index(path)
+            end = index[-1].offset + _CHUNK.size + index[-1].length if index else _HEADER.size
+            self.discarded = self.file.tell() - end
+            if self.discarded:
+                self.file.truncate(end)
+                self.file.seek(end)
+        self._recover(index)
+
+    def _recover(self, index):
+        """Memindah chunk terbuka dari checkpoint proses sebelumnya (kill / crash) ke arsip."""
+        if not os.path.exists(self.checkpoint_path):
+            return
+        try:
+            chunks = read_index(self.checkpoint_path)
+        except ValueError:
+            chunks = []
+        # Chunk yang sudah ditutup sebelum crash tetap ada di checkpoint lama; jangan digandakan
+        sealed = {(c.slave, c.function, c.address, c.first) for c in index}
+        with open(self.checkpoint_path, 'rb') as f:
+            for info in chunks:
+                if (info.slave, info.function, info.address, info.first) in sealed:
+                    continue
+                f.seek(info.offset)
+                self.file.write(f.read(_CHUNK.size + info.length))
+                self.recovered += 1
+        self.file.flush()
+        os.remove(self.checkpoint_path)
+
+    def append(self, slave_id, function_code, address, value, now=None):
+        """Menambah satu sampel (nilai integer, mis. kecepatan signed) ke stream register."""
+        t = int(round((time.time() if now is None else now) * 1000))
+        key = (slave_id, function_code, address)
+        with self.lock:
+            if self.file is None:
+                return
+            stream = self.streams.get(key)
+            if stream is not None:
+                # Jam mundur (mis. sinkronisasi NTP) tidak boleh membuat run negatif
+                t = max(t, stream.last)
+            if stream is not None and (t - stream.first >= self.chunk_ms or stream.runs >= self.max_runs):
+                self._write_chunk(key, stream)
+                stream = None
+            if stream is None:
+                stream = self.streams[key] = _Stream()
+                stream.first = stream.prev_start = t
+                stream.base = stream.prev_value = value
+            elif stream.run_value != value:
+                stream.close_run()
+
+            if stream.run_n == 0:
+                stream.run_start = t
+                stream.run_value = value
+            stream.run_last = stream.last = t
+            stream.run_n += 1
+            stream.samples += 1
+            if t >= self.next_checkpoint:
+                self._checkpoint(t)
+
+    def checkpoint(self, now=None):
+        """Menulis checkpoint chunk terbuka jika sudah jatuh tempo (mis. saat polling gagal dan tidak ada sampel baru)."""
+        t = int(round((time.time() if now is None else now) * 1000))
+        with self.lock:
+            if self.file is not None and self.streams and t >= self.next_checkpoint:
+                self._checkpoint(t)
+
+    def _checkpoint(self, t):
+        """Menulis semua chunk terbuka ke file checkpoint (diganti atomik, arsip utama tidak disentuh)."""
+        if self.streams:
+            tmp = self.checkpoint_path + ".tmp"
+            with open(tmp, 'wb') as f:
+                f.write(_HEADER.pack(MAGIC, 1))
+                for key, stream in self.streams.items():
+                    f.write(self._encode(key, stream))
+            os.replace(tmp, self.checkpoint_path)
+        elif os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        self.next_checkpoint = t + self.flush_ms
+
+    def _encode(self, key, stream):
+        """Header + payload chunk untuk run stream, termasuk run yang belum ditutup."""
+        columns = (stream.dt, stream.dv, stream.n, stream.span)
+        runs = stream.runs
+        if stream.run_n or sys.byteorder == 'big':
+            columns = [array(c.typecode, c) for c in columns]
+        if stream.run_n:
+            # Salinan run berjalan; stream sendiri tidak diubah
+            columns[0].append(stream.run_start - stream.prev_start)
+            columns[1].append(stream.run_value - stream.prev_value)
+            columns[2].append(stream.run_n)
+            columns[3].append(stream.run_last - stream.run_start)
+            runs += 1
+        if sys.byteorder == 'big':
+            # Payload selalu little-endian
+            for c in columns:
+                c.byteswap()
+        payload = zlib.compress(b"".join(c.tobytes() for c in columns))
+        slave_id, function_code, address = key
+        return _CHUNK.pack(CHUNK_MAGIC, slave_id, function_code, address, stream.first, stream.last,
+                           stream.base, stream.samples, runs, len(payload)) + payload
+
+    def _write_chunk(self, key, stream):
+        if stream.run_n:
+            stream.close_run()
+        self.file.write(self._encode(key, stream))
+        self.file.flush()
+        del self.streams[key]
+        # Checkpoint masih berisi chunk ini; tulis ulang secepatnya agar tidak digandakan
+        self.next_checkpoint = 0
+
+    def flush(self):
+        """Menutup dan menulis semua chunk yang terbuka (mis. sebelum backup)."""
+        with self.lock:
+            if self.file is not None:
+                for key, stream in list(self.streams.items()):
+                    self._write_chunk(key, stream)
+                self._checkpoint(0)
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def read_index(path):
+    """Daftar ChunkInfo dari header chunk saja; chunk terakhir yang terpotong diabaikan."""
+    chunks = []
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size or header[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} bukan file arsip telemetri.")
+        offset = _HEADER.size
+        while offset + _CHUNK.size <= size:
+            f.seek(offset)
+            magic, *fields = _CHUNK.unpack(f.read(_CHUNK.size))
+            if magic != CHUNK_MAGIC or offset + _CHUNK.size + fields[-1] > size:
+                break
+            chunks.append(ChunkInfo(offset, *fields))
+            offset += _CHUNK.size + fields[-1]
+    return chunks
+
+
+@lru_cache(maxsize=None)
+def _numpy():
+    """Modul NumPy (di-import saat pertama dibutuhkan), None jika tidak terpasang."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _runs(info, payload):
+    raw = zlib.decompress(payload)
+    width = 4 * info.runs
+    if len(raw) != 4 * width:
+        raise ValueError(f"Payload chunk di offset {info.offset} rusak.")
+    return [raw[i * width:(i + 1) * width] for i in range(4)]
+
+
+def decode_chunk(info, payload):
+    """
+    Payload chunk -> (waktu dalam detik, nilai) sebagai array NumPy, atau list tanpa NumPy.
+
+    Payload yang rusak menaikkan zlib.error atau ValueError.
+    """
+    dt, dv, n, span = _runs(info, payload)
+    np = _numpy()
+    if np is None:
+        return _decode_python(info, dt, dv, n, span)
+
+    dt = np.frombuffer(dt, '<i4')
+    dv = np.frombuffer(dv, '<i4')
+    n = np.frombuffer(n, '<u4').astype(np.int64)
+    span = np.frombuffer(span, '<u4')
+    starts = info.first + np.cumsum(dt, dtype=np.int64)
+    values = info.base + np.cumsum(dv, dtype=np.int64)
+    step = np.divide(span, n - 1, out=np.zeros(len(n)), where=n > 1)
+    run = np.repeat(np.arange(len(n)), n)
+    offset = np.arange(info.samples) - np.repeat(np.cumsum(n) - n, n)
+    return (starts[run] + offset * step[run]) / 1000.0, values[run]
+
+
+def _decode_python(info, dt, dv, n, span):
+    times, values = [], []
+    start, value = info.first, info.base
+    columns = [array(code, raw) for code, raw in zip("iiII", (dt, dv, n, span))]
+    if sys.byteorder == 'big':
+        for c in columns:
+            c.byteswap()
+    for run_dt, run_dv, run_n, run_span in zip(*columns):
+        start += run_dt
+        value += run_dv
+        step = run_span / (run_n - 1) if run_n > 1 else 0.0
+        times.extend((start + i * step) / 1000.0 for i in range(run_n))
+        values.extend([value] * run_n)
+    return times, values
+
+
+def read_range(path, slave_id, function_code, address, start=None, end=None, index=None, skipped=None):
+    """
+    Sampel satu register dalam rentang waktu [start, end] (detik epoch, None = tanpa batas).
+
+    Hanya chunk yang beririsan dengan rentang yang dibaca dan didekode.
+    `index` dari read_index() bisa dipakai ulang untuk beberapa query.
+    Chunk yang gagal didekode dilewati; ChunkInfo-nya ditambahkan ke list `skipped`.
+    """
+    if index is None:
+        index = read_index(path)
+    start_ms = None if start is None else start * 1000
+    end_ms = None if end is None else end * 1000
+    parts = []
+    with open(path, 'rb') as f:
+        for info in index:
+            if (info.slave, info.function, info.address) != (slave_id, function_code, address):
+                continue
+            if start_ms is not None and info.last < start_ms or end_ms is not None and info.first > end_ms:
+                continue
+            f.seek(info.offset + _CHUNK.size)
+            try:
+                parts.append(decode_chunk(info, f.read(info.length)))
+            except (zlib.error, ValueError):
+                if skipped is not None:
+                    skipped.append(info)
+
+    np = _numpy()
+    if np is not None:
+        if not parts:
+            return np.empty(0), np.empty(0, np.int64)
+        times = np.concatenate([p[0] for p in parts])
+        values = np.concatenate([p[1] for p in parts])
+        mask = np.ones(len(times), bool)
+        if start is not None:
+            mask &= times >= start
+        if end is not None:
+            mask &= times <= end
+        return times[mask], values[mask]
+
+    samples = [(t, v) for p in parts for t, v in zip(*p)
+               if (start is None or t >= start) and (end is None or t <= end)]
+    return [t for t, _ in samples], [v for _, v in samples]
+
+
+def trend(times, values, bucket):
+    """Min / rata-rata / max per ember waktu `bucket` detik -> list (awal ember, min, mean, max, jumlah)."""
+    if len(times) == 0:
+        return []
+    np = _numpy()
+    if np is not None:
+        keys = np.floor(times / bucket).astype(np.int64)
+        edges = np.flatnonzero(np.diff(keys)) + 1
+        starts = np.concatenate(([0], edges))
+        counts = np.diff(np.concatenate((starts, [len(keys)])))
+        return list(zip(keys[starts] * bucket, np.minimum.reduceat(values, starts),
+                        np.add.reduceat(values, starts) / counts, np.maximum.reduceat(values, starts), counts))
+
+    buckets = {}
+    for t, v in zip(times, values):
+        buckets.setdefault(int(t // bucket), []).append(v)
+    return [(key * bucket, min(vs), sum(vs) / len(vs), max(vs), len(vs)) for key, vs in sorted(buckets.items())]
+
+
+def _parse_time(text):
+    """Detik epoch atau tanggal ISO (waktu lokal)."""
+    if text is None:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        return datetime.fromisoformat(text).timestamp()
+
+
+def _format_time(t):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(t))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Arsip telemetri register Modbus (delta + run-length).")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    p_info = sub.add_parser("info", help="Ringkasan stream dan rasio kompresi")
+    p_info.add_argument("archive")
+
+    p_trend = sub.add_parser("trend", help="Min / rata-rata / max per ember waktu")
+    p_trend.add_argument("archive")
+    p_trend.add_argument("--slave", type=int, default=1)
+    p_trend.add_argument("--function", type=lambda s: int(s, 0), default=0x04)
+    p_trend.add_argument("--address", type=lambda s: int(s, 0), default=0x0000)
+    p_trend.add_argument("--start", help="Detik epoch atau tanggal ISO, mis. 2026-10-01T08:00")
+    p_trend.add_argument("--end", help="Detik epoch atau tanggal ISO")
+    p_trend.add_argument("--bucket", type=float, default=60.0, help="Lebar ember (detik)")
+    args = parser.parse_args(argv)
+
+    index = read_index(args.archive)
+    if args.mode == "info":
+        streams = {}
+        for info in index:
+            s = streams.setdefault((info.slave, info.function, info.address), [0, 0, 0, 0, info.first, info.last])
+            s[0] += 1
+            s[1] += info.samples
+            s[2] += info.runs
+            s[3] += _CHUNK.size + info.length
+            s[5] = max(s[5], info.last)
+        total_samples = sum(s[1] for s in streams.values())
+        for (slave, function, address), (chunks, samples, runs, size, first, last) in sorted(streams.items()):
+            print(f"slave {slave:3d} fc {function:02X} reg 0x{address:04X}: {samples:,d} sampel, {runs:,d} run, "
+                  f"{chunks} chunk, {size:,d} byte, {_format_time(first / 1000)} .. {_format_time(last / 1000)}")
+        size = os.path.getsize(args.archive)
+        # Pembanding: log polos 16 byte per sampel (waktu double + nilai + kunci)
+        raw = 16 * total_samples
+        ratio = f", {raw / size:.0f}x lebih kecil dari log polos" if size else ""
+        print(f"{size:,d} byte untuk {total_samples:,d} sampel{ratio}")
+        return 0
+
+    skipped = []
+    times, values = read_range(args.archive, args.slave, args.function, args.address,
+                               _parse_time(args.start), _parse_time(args.end), index, skipped)
+    for info in skipped:
+        print(f"Peringatan: chunk rusak dilewati ({info.samples} sampel, "
+              f"{_format_time(info.first / 1000)} .. {_format_time(info.last / 1000)})", file=sys.stderr)
+    for start, low, mean, high, count in trend(times, values, args.bucket):
+        print(f"{_format_time(start)}  min {low:7d}  rata2 {mean:9.1f}  max {high:7d}  ({count} sampel)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Cache status drive bersama: nilai terakhir, waktu, dan kualitas per register.
+
+Polling dijalankan satu kali oleh PollScheduler dan hasilnya disimpan di
+DriveStateCache. Semua konsumen (monitor, label GUI, klien daemon, jembatan
+HAL) membaca dari cache dengan kontrak umur maksimum:
+
+    cache.read(slave, 0x04, 0x0000, max_age=0.5)
+
+Jika nilai di cache lebih muda dari `max_age`, tidak ada trafik bus sama
+sekali; jika lebih tua, register dibaca ulang sekali (permintaan bersamaan
+untuk register yang sama digabung). Menambah tampilan atau konsumen HAL
+tidak menambah beban Modbus.
+
+Kualitas:
+    good     hasil baca terakhir berhasil dan masih dalam umur yang diminta
+    stale    hasil baca terakhir berhasil tapi lebih tua dari umur yang diminta
+    bad      baca terakhir gagal; `value` adalah nilai baik terakhir (atau None)
+"""
+import heapq
+import threading
+import time
+from collections import namedtuple
+
+import modbus_core
+
+GOOD = "good"
+STALE = "stale"
+BAD = "bad"
+
+CachedValue = namedtuple("CachedValue", "value time quality")
+
+
+def signed(value):
+    """Nilai register 16-bit -> signed (None tetap None)."""
+    if value is None:
+        return None
+    return value - 0x10000 if value & 0x8000 else value
+
+
+class DriveStateCache:
+    """Cache register semua slave di satu transport, kunci (slave, function, alamat)."""
+
+    def __init__(self, transport):
+        self.transport = modbus_core.as_transport(transport)
+        self.entries = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def peek(self, slave_id, function_code, address, max_age=None):
+        """Nilai cache tanpa akses bus; kualitas 'stale' jika lebih tua dari `max_age`."""
+        entry = self.entries.get((slave_id, function_code, address))
+        if entry is None:
+            return CachedValue(None, None, BAD)
+        if entry.quality == GOOD and max_age is not None and time.monotonic() - entry.time > max_age:
+            return entry._replace(quality=STALE)
+        return entry
+
+    def read(self, slave_id, function_code, address, max_age=1.0):
+        """Nilai dengan umur paling lama `max_age` detik; baca bus hanya jika perlu."""
+        key = (slave_id, function_code, address)
+        entry = self.entries.get(key)
+        if entry is not None and entry.quality == GOOD and time.monotonic() - entry.time <= max_age:
+            self.hits += 1
+            return entry
+        with self.refresh_lock:
+            # Thread lain mungkin sudah membaca register ini selagi kita menunggu
+            entry = self.entries.get(key)
+            if entry is not None and entry.quality == GOOD and time.monotonic() - entry.time <= max_age:
+                self.hits += 1
+                return entry
+            self.misses += 1
+            self.refresh(slave_id, function_code, address, 1)
+        return self.entries[key]
+
+    def refresh(self, slave_id, function_code, address, count=1):
+        """Membaca `count` register dari bus dan mengisi cache. True jika berhasil."""
+        try:
+            values = self.transport.read_registers(slave_id, function_code, address, count)
+        except Exception as e:
+            # Error apa pun (termasuk port serial hilang) dicatat sebagai kualitas buruk
+            with self.lock:
+                for offset in range(count):
+                    key = (slave_id, function_code, address + offset)
+                    old = self.entries.get(key)
+                    self.entries[key] = CachedValue(old.value if old else None, old.time if old else None, BAD)
+                    self.errors[key] = str(e)
+            return False
+        now = time.monotonic()
+        with self.lock:
+            for offset, value in enumerate(values):
+                key = (slave_id, function_code, address + offset)
+                self.entries[key] = CachedValue(value, now, GOOD)
+                self.errors.pop(key, None)
+        return True
+
+    def error(self, slave_id, function_code, address):
+        """Pesan error baca terakhir untuk register, None jika baca terakhir berhasil."""
+        return self.errors.get((slave_id, function_code, address))
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "registers": len(self.entries)}
+
+
+class PollScheduler:
+    """
+    Thread yang membaca daftar Poll (modbus_timing.Poll) sesuai lajunya ke cache.
+
+    Poll dengan `rate` None dibaca setiap `default_period` detik. Setelah
+    setiap poll, `on_update(poll, ok)` dipanggil (mis. untuk menyebarkan
+    telemetri ke klien).
+    """
+
+    def __init__(self, cache, polls, default_period=1.0, on_update=None):
+        self.cache = cache
+        self.polls = list(polls)
+        self.default_period = default_period
+        self.on_update = on_update
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def period(self, poll):
+        return 1.0 / poll.rate if poll.rate else self.default_period
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=max(map(self.period, self.polls), default=0) + 1.5)
+
+    def run(self):
+        now = time.monotonic()
+        due = [(now, i) for i in range(len(self.polls))]
+        heapq.heapify(due)
+        while due and not self.stop_event.is_set():
+            when, i = due[0]
+            delay = when - time.monotonic()
+            if delay > 0 and self.stop_event.wait(delay):
+                break
+            heapq.heappop(due)
+            poll = self.polls[i]
+            ok = self.cache.refresh(poll.slave, poll.function, poll.address, poll.count)
+            if self.on_update is not None:
+                self.on_update(poll, ok)
+            # Jika tertinggal (bus lambat), jadwal berikutnya dihitung dari sekarang
+            heapq.heappush(due, (max(when + self.period(poll), time.monotonic()), i))
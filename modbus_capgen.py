@@ -0,0 +1,329 @@
+"""
+Generator capture sintetis untuk benchmark dan fuzzing parser capture.
+
+Menghasilkan trafik Modbus RTU realistis (request master + respons slave)
+untuk beberapa slave dan menulisnya dalam dua layout CSV yang dibaca
+modbus_capture.read_capture() dan parser lama:
+
+    logic1  Time [s],Value,Parity Error,Framing Error          (seperti data.txt)
+    logic2  name,type,start_time,duration,"data"               (seperti data-modbus-lincnc.csv)
+
+Waktu tiap byte dihitung dari setting jalur (modbus_timing.LineConfig):
+byte dalam satu frame berjarak tepat satu karakter, respons dimulai setelah
+waktu proses slave, dan request berikutnya setelah jeda master. Respons
+dibuat oleh simulator register (modbus_server.DriveSimulator), jadi nilai
+baca mengikuti perintah tulis sebelumnya.
+
+Error yang bisa disuntikkan (peluang per frame):
+    crc       satu byte CRC dibalik
+    truncate  frame dipotong di tengah
+    parity    satu byte diberi flag parity error (nilainya ikut rusak)
+    framing   satu byte diberi flag framing error
+Request yang rusak tidak dijawab slave (seperti slave RS-485 asli) dan master
+menunggu sampai timeout.
+
+Timing default realistis (jeda milidetik) dan cocok untuk modbus_capture.py
+yang memisah frame dengan silence 3,5 karakter. Parser lama memisah pesan
+dengan ambang waktu tetap (modbus_parser.py 1 s, modbus_parser_new.py 0,1 s),
+jadi untuk benchmark parser itu pakai `--preset` yang memilih layout dan
+jeda di atas ambangnya; jumlah pesan yang harus ditemukan parser dicetak
+dan bisa dicek dengan `--expect-messages` di parser.
+
+Contoh:
+    python modbus_capgen.py capture-10m.csv --rows 10000000 --slaves 1,2,3 --profile lincnc
+    python modbus_capgen.py capture-fuzz.txt --preset parser-new --rows 200000 --crc 0.01 --truncate 0.01 --parity-errors 0.005
+    python modbus_parser_new.py capture-fuzz.txt --profile --expect-messages <jumlah pesan>
+"""
+import argparse
+import random
+import sys
+from collections import namedtuple
+
+from modbus_core import calculate_crc
+from modbus_server import DriveSimulator
+from modbus_timing import LineConfig
+
+LAYOUTS = ("logic1", "logic2")
+
+# Flag per byte, sama dengan modbus_capture.PARITY_ERROR / FRAMING_ERROR
+PARITY_ERROR = 1
+FRAMING_ERROR = 2
+
+# Register yang dipolling dan perintah tulis (alamat, nilai yang mungkin) per profil drive
+TRAFFIC = {
+    "mige": {
+        "polls": [(0x04, 0x0000, 1), (0x04, 0x0001, 1)],
+        "commands": [(0x0062, (0, 1)), (0x0089, range(0, 24001, 100)), (0x0079, (0, 1)), (0x007A, (0, 1))],
+    },
+    "leo": {
+        "polls": [(0x03, 0x5000, 1)],
+        "commands": [(0x6000, (1, 2, 5)), (0x5000, range(0, 10001, 100))],
+    },
+    "lincnc": {
+        "polls": [(0x03, 0x0108, 1)],
+        "commands": [(0x0002, (1, 2, 4)), (0x0004, range(0, 24001, 100))],
+    },
+}
+
+# Timing default (detik): realistis, dipisah per frame oleh modbus_capture.py
+DEFAULT_TIMING = {"layout": "logic2", "turnaround": 0.002, "gap": 0.005, "timeout": 0.1}
+
+# Preset per parser lama: layout yang dibacanya dan jeda di atas ambang pemisah pesannya,
+# sehingga setiap frame (request maupun respons) menjadi tepat satu pesan
+PRESETS = {
+    "parser": {"layout": "logic2", "turnaround": 1.5, "gap": 1.5, "timeout": 2.0},      # ambang 1 s
+    "parser-new": {"layout": "logic1", "turnaround": 0.15, "gap": 0.15, "timeout": 0.5},  # ambang 0,1 s
+}
+
+SyntheticFrame = namedtuple("SyntheticFrame", "start data flags")
+
+_HEX = ["0x%02X" % i for i in range(256)]
+
+
+class TrafficGenerator:
+    """
+    Sumber frame sintetis berurutan waktu.
+
+    Master bergiliran ke setiap slave: polling register profil, dan dengan
+    peluang `command_rate` mengirim satu perintah FC06. `slaves` boleh berisi
+    id yang tidak ada di `silent` agar sebagian request tidak pernah dijawab.
+    """
+
+    def __init__(self, slaves=(1,), profile="lincnc", line=None, turnaround=0.002, gap=0.005,
+                 timeout=0.1, command_rate=0.05, errors=None, silent=(), seed=0, start=0.0):
+        self.slaves = list(slaves)
+        self.traffic = TRAFFIC[profile]
+        self.drives = {slave: DriveSimulator(profile) for slave in self.slaves if slave not in silent}
+        self.line = line or LineConfig()
+        self.turnaround = turnaround
+        self.gap = gap
+        self.timeout = timeout
+        self.command_rate = command_rate
+        self.errors = dict.fromkeys(("crc", "truncate", "parity", "framing"), 0.0)
+        self.errors.update(errors or {})
+        self.rng = random.Random(seed)
+        self.time = start
+        self.counts = dict.fromkeys(("frames", "bytes", "requests", "responses", "timeouts",
+                                     "crc", "truncate", "parity", "framing"), 0)
+
+    def next_request(self, slave):
+        rng = self.rng
+        if rng.random() < self.command_rate:
+            address, values = rng.choice(self.traffic["commands"])
+            pdu = bytes((0x06,)) + address.to_bytes(2, 'big') + rng.choice(values).to_bytes(2, 'big')
+        else:
+            function_code, address, count = rng.choice(self.traffic["polls"])
+            pdu = bytes((function_code,)) + address.to_bytes(2, 'big') + count.to_bytes(2, 'big')
+        adu = bytes((slave,)) + pdu
+        return adu + calculate_crc(adu)
+
+    def corrupt(self, adu):
+        """Menyuntikkan error sesuai peluangnya; (adu, flags per byte atau None, rusak?)."""
+        rng = self.rng
+        errors = self.errors
+        data = bytearray(adu)
+        flags = None
+        damaged = False
+        if errors["crc"] and rng.random() < errors["crc"]:
+            data[-rng.randint(1, 2)] ^= 1 << rng.randrange(8)
+            self.counts["crc"] += 1
+            damaged = True
+        if errors["truncate"] and rng.random() < errors["truncate"]:
+            del data[rng.randint(1, len(data) - 1):]
+            self.counts["truncate"] += 1
+            damaged = True
+        for kind, flag in (("parity", PARITY_ERROR), ("framing", FRAMING_ERROR)):
+            if errors[kind] and rng.random() < errors[kind]:
+                if flags is None:
+                    flags = bytearray(len(data))
+                i = rng.randrange(len(data))
+                flags[i] |= flag
+                data[i] ^= 1 << rng.randrange(8)
+                self.counts[kind] += 1
+                damaged = True
+        return bytes(data), flags, damaged
+
+    def _emit(self, adu, flags):
+        frame = SyntheticFrame(self.time, adu, flags)
+        self.time += self.line.air_time(len(adu))
+        self.counts["frames"] += 1
+        self.counts["bytes"] += len(adu)
+        return frame
+
+    def transaction(self, slave):
+        """Satu request dan (jika dijawab) responsnya."""
+        request = self.next_request(slave)
+        sent, flags, damaged = self.corrupt(request)
+        self.counts["requests"] += 1
+        yield self._emit(sent, flags)
+
+        drive = self.drives.get(slave)
+        if drive is None or damaged:
+            self.counts["timeouts"] += 1
+            self.time += self.timeout
+        else:
+            response = bytes((slave,)) + drive.handle_pdu(request[1:-2])
+            response, flags, _ = self.corrupt(response + calculate_crc(response))
+            self.time += self.turnaround
+            self.counts["responses"] += 1
+            yield self._emit(response, flags)
+        self.time += self.gap
+
+    def frames(self):
+        """Frame tanpa akhir; batasi dengan itertools.islice atau limit_rows()."""
+        while True:
+            for slave in self.slaves:
+                yield from self.transaction(slave)
+
+
+def limit_rows(frames, rows=None, duration=None, counts=None):
+    """
+    Memotong aliran frame setelah `rows` byte atau setelah waktu `duration` (detik).
+    Jika `counts` diberikan, counts["written"] diisi jumlah frame yang diteruskan.
+    """
+    total = 0
+    end = None
+    for frame in frames:
+        if end is None:
+            end = frame.start + duration if duration is not None else None
+        if rows is not None and total >= rows or end is not None and frame.start >= end:
+            return
+        if rows is not None and total + len(frame.data) > rows:
+            frame = frame._replace(data=frame.data[:rows - total],
+                                   flags=frame.flags[:rows - total] if frame.flags else None)
+        total += len(frame.data)
+        if counts is not None:
+            counts["written"] = counts.get("written", 0) + 1
+        yield frame
+
+
+def write_capture(f, frames, line, layout="logic2", error_column=False):
+    """
+    Menulis frame ke file teks dalam layout logic1 / logic2, satu baris per byte.
+    Mengembalikan jumlah baris data yang ditulis.
+
+    Layout logic2 asli tidak punya kolom error; `error_column=True`
+    menambahkan kolom "error" (parity / framing) seperti ekspor Logic 2 yang
+    mengaktifkan flag error.
+    """
+    char = line.char_time
+    hexes = _HEX
+    total = 0
+    if layout == "logic1":
+        f.write("Time [s],Value,Parity Error,Framing Error\n")
+        for frame in frames:
+            t = frame.start
+            flags = frame.flags
+            rows = []
+            for i, value in enumerate(frame.data):
+                if flags and flags[i]:
+                    rows.append("%.15f,%s,%s,%s\n" % (t + i * char, hexes[value],
+                                                       "Error" if flags[i] & PARITY_ERROR else "",
+                                                       "Error" if flags[i] & FRAMING_ERROR else ""))
+                else:
+                    rows.append("%.15f,%s,,\n" % (t + i * char, hexes[value]))
+            f.writelines(rows)
+            total += len(rows)
+    elif layout == "logic2":
+        # Durasi diukur logic analyzer dari start bit sampai tengah stop bit
+        duration = "%.6f" % ((line.bits_per_char - 0.5) / line.baudrate)
+        prefix = '"Async Serial","data",'
+        f.write('name,type,start_time,duration,"data"' + (',"error"\n' if error_column else "\n"))
+        for frame in frames:
+            t = frame.start
+            flags = frame.flags
+            if error_column:
+                rows = ["%s%.6f,%s,%s,%s\n" % (prefix, t + i * char, duration, hexes[value],
+                                                _error_name(flags[i] if flags else 0))
+                        for i, value in enumerate(frame.data)]
+            else:
+                rows = ["%s%.6f,%s,%s\n" % (prefix, t + i * char, duration, hexes[value])
+                        for i, value in enumerate(frame.data)]
+            f.writelines(rows)
+            total += len(rows)
+    else:
+        raise ValueError(f"Layout tidak dikenal: {layout}")
+    return total
+
+
+def _error_name(flag):
+    if flag & PARITY_ERROR:
+        return "parity"
+    if flag & FRAMING_ERROR:
+        return "framing"
+    return ""
+
+
+def _parse_slaves(text):
+    return [int(s, 0) for s in text.split(",") if s]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Buat capture Modbus RTU sintetis untuk benchmark / fuzzing parser.")
+    parser.add_argument("output", help="File tujuan, '-' untuk stdout")
+    parser.add_argument("--preset", choices=sorted(PRESETS),
+                        help="Layout dan jeda untuk benchmark modbus_parser.py (parser) / modbus_parser_new.py "
+                             "(parser-new): setiap frame dipisah di atas ambang parser")
+    parser.add_argument("--layout", choices=LAYOUTS,
+                        help="logic1 = format data.txt, logic2 = format data-modbus-lincnc.csv")
+    parser.add_argument("--rows", type=int, help="Jumlah baris (byte) yang ditulis")
+    parser.add_argument("--duration", type=float, help="Panjang capture (detik waktu bus)")
+    parser.add_argument("--profile", default="lincnc", choices=sorted(TRAFFIC))
+    parser.add_argument("--slaves", type=_parse_slaves, default=[1], help="Daftar id slave, mis. 1,2,3")
+    parser.add_argument("--silent", type=_parse_slaves, default=[], help="Id slave yang tidak pernah menjawab")
+    parser.add_argument("--baud", type=int, default=38400)
+    parser.add_argument("--parity", default="Even", choices=["None", "Even", "Odd"])
+    parser.add_argument("--stopbits", type=int, default=1, choices=[1, 2])
+    parser.add_argument("--turnaround", type=float, help="Waktu proses slave (detik, default 0.002)")
+    parser.add_argument("--gap", type=float, help="Jeda master antar transaksi (detik, default 0.005)")
+    parser.add_argument("--timeout", type=float, help="Waktu tunggu master jika tidak dijawab (default 0.1)")
+    parser.add_argument("--command-rate", type=float, default=0.05, help="Peluang transaksi berupa perintah tulis")
+    parser.add_argument("--crc", type=float, default=0.0, help="Peluang frame dengan CRC salah")
+    parser.add_argument("--truncate", type=float, default=0.0, help="Peluang frame terpotong")
+    parser.add_argument("--parity-errors", type=float, default=0.0, help="Peluang frame dengan flag parity error")
+    parser.add_argument("--framing-errors", type=float, default=0.0, help="Peluang frame dengan flag framing error")
+    parser.add_argument("--start", type=float, default=0.0, help="Waktu byte pertama (detik)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.rows is None and args.duration is None:
+        parser.error("isi --rows dan/atau --duration")
+    # Nilai eksplisit menang atas preset, preset menang atas default
+    for key, value in PRESETS.get(args.preset, DEFAULT_TIMING).items():
+        if getattr(args, key) is None:
+            setattr(args, key, value)
+    if args.preset is not None:
+        preset = PRESETS[args.preset]
+        if args.layout != preset["layout"] or min(args.turnaround, args.gap) < preset["turnaround"]:
+            parser.error(f"preset {args.preset} butuh --layout {preset['layout']} dan jeda >= {preset['turnaround']} s")
+
+    line = LineConfig(args.baud, args.parity, args.stopbits)
+    generator = TrafficGenerator(
+        args.slaves, args.profile, line,
+        turnaround=args.turnaround, gap=args.gap, timeout=args.timeout, command_rate=args.command_rate,
+        errors={"crc": args.crc, "truncate": args.truncate,
+                "parity": args.parity_errors, "framing": args.framing_errors},
+        silent=args.silent, seed=args.seed, start=args.start,
+    )
+    written = {}
+    frames = limit_rows(generator.frames(), args.rows, args.duration, written)
+    error_column = bool(args.parity_errors or args.framing_errors)
+
+    if args.output == "-":
+        rows = write_capture(sys.stdout, frames, line, args.layout, error_column)
+    else:
+        with open(args.output, 'w', buffering=1024 * 1024) as f:
+            rows = write_capture(f, frames, line, args.layout, error_column)
+
+    c = generator.counts
+    print(f"{rows} baris, {written.get('written', 0)} frame, {c['requests']} request, {c['responses']} respons, "
+          f"{c['timeouts']} timeout; error: crc {c['crc']}, truncate {c['truncate']}, "
+          f"parity {c['parity']}, framing {c['framing']}", file=sys.stderr)
+    if args.preset is not None:
+        script = "modbus_parser.py" if args.preset == "parser" else "modbus_parser_new.py"
+        print(f"{written.get('written', 0)} pesan diharapkan di {script} (--expect-messages)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""
+Pembaca capture logic analyzer (satu baris per byte) menjadi frame dan transaksi Modbus RTU.
+
+Dua layout CSV yang didukung, sama dengan yang dibaca parser lama:
+
+    Time [s],Value,Parity Error,Framing Error          (data.txt, data-modbus-lincnc2.csv)
+    name,type,start_time,duration,"data"               (data-modbus-lincnc.csv)
+
+Layout kedua boleh punya kolom tambahan "error" (parity / framing), seperti
+ekspor Logic 2 dengan flag error dan capture dari modbus_capgen.py.
+
+Tahapan: read_capture() -> iter_frames() -> decode_frame() -> iter_transactions().
+Semuanya generator, jadi capture besar diproses tanpa memuat seluruh file.
+File journal biner (modbus_journal.py) juga diterima lewat iter_capture_frames()
+dan iter_capture_transactions().
+"""
+import csv
+from collections import namedtuple
+
+from modbus_core import calculate_crc
+
+DEFAULT_BAUDRATE = 38400
+BITS_PER_CHAR = 11  # start + 8 data + parity + stop (RTU)
+
+# Flag error per byte dari logic analyzer
+PARITY_ERROR = 1
+FRAMING_ERROR = 2
+
+ByteSample = namedtuple("ByteSample", "time value errors")
+Frame = namedtuple("Frame", "start end data errors")
+Transaction = namedtuple("Transaction", "request response")
+
+
+def char_time(baudrate=DEFAULT_BAUDRATE, bits=BITS_PER_CHAR):
+    """Durasi satu karakter di kabel (detik)."""
+    return bits / float(baudrate)
+
+
+def read_capture(path):
+    """Membaca file capture dan menghasilkan ByteSample per baris yang valid."""
+    with open(path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        header = [h.strip().strip('"').lower() for h in next(reader)]
+
+        error_col = None
+        if "start_time" in header:
+            time_col, value_col = header.index("start_time"), header.index("data")
+            parity_col = framing_col = None
+            error_col = header.index("error") if "error" in header else None
+        else:
+            time_col, value_col = 0, 1
+            parity_col = 2 if len(header) > 2 else None
+            framing_col = 3 if len(header) > 3 else None
+
+        for row in reader:
+            try:
+                t = float(row[time_col])
+                value = int(row[value_col].strip().strip('"'), 16)
+            except (ValueError, IndexError):
+                # Lewati baris dengan data yang tidak valid
+                continue
+            errors = 0
+            if parity_col is not None and len(row) > parity_col and row[parity_col].strip():
+                errors |= PARITY_ERROR
+            if framing_col is not None and len(row) > framing_col and row[framing_col].strip():
+                errors |= FRAMING_ERROR
+            if error_col is not None and len(row) > error_col and row[error_col].strip():
+                errors |= FRAMING_ERROR if "framing" in row[error_col].lower() else PARITY_ERROR
+            yield ByteSample(t, value, errors)
+
+
+def iter_frames(samples, baudrate=DEFAULT_BAUDRATE, gap=None):
+    """
+    Mengelompokkan byte menjadi frame RTU.
+
+    Frame baru dimulai jika jarak antar awal byte lebih dari satu karakter
+    ditambah jeda 3.5 karakter (aturan silent interval Modbus RTU).
+    """
+    if gap is None:
+        gap = 4.5 * char_time(baudrate)
+
+    data = bytearray()
+    start = last = None
+    errors = 0
+    for sample in samples:
+        if data and sample.time - last > gap:
+            yield Frame(start, last + char_time(baudrate), bytes(data), errors)
+            data = bytearray()
+            errors = 0
+        if not data:
+            start = sample.time
+        data.append(sample.value)
+        errors |= sample.errors
+        last = sample.time
+
+    if data:
+        yield Frame(start, last + char_time(baudrate), bytes(data), errors)
+
+
+def iter_capture_frames(path, baudrate=DEFAULT_BAUDRATE):
+    """Frame dari file capture CSV atau journal biner, dideteksi dari isi file."""
+    import modbus_journal
+
+    if modbus_journal.is_journal(path):
+        return modbus_journal.iter_frames(modbus_journal.read_journal(path), baudrate)
+    return iter_frames(read_capture(path), baudrate)
+
+
+def iter_capture_transactions(path, baudrate=DEFAULT_BAUDRATE, timeout=1.5):
+    """Transaksi dari file capture CSV atau journal biner (arah frame journal sudah pasti)."""
+    import modbus_journal
+
+    if modbus_journal.is_journal(path):
+        return modbus_journal.iter_transactions(modbus_journal.read_journal(path), baudrate, timeout)
+    return iter_transactions(iter_frames(read_capture(path), baudrate), timeout)
+
+
+def crc_ok(data):
+    return len(data) >= 4 and calculate_crc(data[:-2]) == data[-2:]
+
+
+def decode_frame(data):
+    """
+    Mendekode isi frame RTU menjadi dict.
+
+    Karena request dan respons FC06 identik (echo), `kind` di sini hanya
+    tebakan dari panjang frame; iter_transactions() yang memastikan arah.
+    """
+    info = {"slave": None, "function": None, "crc_ok": crc_ok(data), "kind": "invalid"}
+    if len(data) < 4:
+        return info
+
+    slave, function_code = data[0], data[1]
+    info["slave"] = slave
+    info["function"] = function_code & 0x7F
+
+    if function_code & 0x80:
+        info["kind"] = "exception"
+        info["exception_code"] = data[2]
+    elif function_code in (0x03, 0x04) and len(data) == 8:
+        info["kind"] = "request"
+        info["address"] = int.from_bytes(data[2:4], 'big')
+        info["count"] = int.from_bytes(data[4:6], 'big')
+    elif function_code in (0x03, 0x04) and len(data) == 5 + data[2]:
+        info["kind"] = "response"
+        payload = data[3:3 + data[2]]
+        info["values"] = [int.from_bytes(payload[i:i + 2], 'big') for i in range(0, len(payload) - 1, 2)]
+    elif function_code == 0x06 and len(data) == 8:
+        info["kind"] = "request"
+        info["address"] = int.from_bytes(data[2:4], 'big')
+        info["value"] = int.from_bytes(data[4:6], 'big')
+    elif function_code == 0x10 and len(data) >= 9 and len(data) == 9 + data[6]:
+        info["kind"] = "request"
+        info["address"] = int.from_bytes(data[2:4], 'big')
+        info["count"] = int.from_bytes(data[4:6], 'big')
+        payload = data[7:7 + data[6]]
+        info["values"] = [int.from_bytes(payload[i:i + 2], 'big') for i in range(0, len(payload) - 1, 2)]
+    elif function_code == 0x10 and len(data) == 8:
+        info["kind"] = "response"
+        info["address"] = int.from_bytes(data[2:4], 'big')
+        info["count"] = int.from_bytes(data[4:6], 'big')
+    return info
+
+
+def iter_transactions(frames, timeout=1.5):
+    """
+    Memasangkan request dengan respons berikutnya.
+
+    Frame dianggap respons jika datang dalam `timeout` detik setelah request
+    yang belum dijawab, dengan slave dan function code yang sama (timeout
+    default = MODBUS_MASTER_TIME_OUT_RECEIPT di custom.clp). Request tanpa
+    respons dihasilkan dengan `response=None`.
+    """
+    pending = None
+    for frame in frames:
+        if pending is not None:
+            req = pending.data
+            is_reply = (
+                frame.start - pending.end <= timeout
+                and len(frame.data) >= 2 and len(req) >= 2
+                and frame.data[0] == req[0]
+                and (frame.data[1] & 0x7F) == req[1]
+            )
+            if is_reply:
+                yield Transaction(pending, frame)
+                pending = None
+                continue
+            yield Transaction(pending, None)
+        pending = frame
+
+    if pending is not None:
+        yield Transaction(pending, None)
+
+
+def load_transactions(path, baudrate=DEFAULT_BAUDRATE, timeout=1.5):
+    """Shortcut: file capture -> list Transaction."""
+    return list(iter_capture_transactions(path, baudrate, timeout))
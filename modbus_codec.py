@@ -0,0 +1,115 @@
+"""
+Codec frame Modbus RTU dengan buffer yang dipakai ulang.
+
+Frame dibangun dengan `struct.pack_into` ke `bytearray` milik codec (tanpa
+concatenation bytes), CRC dihitung dengan tabel 256 entri langsung di atas
+`memoryview`, dan respons diurai lewat slice `memoryview` plus `struct.Struct`
+yang sudah dikompilasi. Loop polling berkecepatan tinggi jadi hampir tidak
+membuat objek baru per transaksi.
+
+Satu FrameCodec tidak thread-safe; setiap transport memakai codec sendiri
+di bawah lock-nya.
+"""
+import struct
+from functools import lru_cache
+
+MAX_ADU = 256
+
+
+def _make_crc_table():
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ 0xA001
+            else:
+                crc >>= 1
+        table.append(crc)
+    return tuple(table)
+
+
+CRC_TABLE = _make_crc_table()
+
+_CRC = struct.Struct('<H')
+_REQUEST = struct.Struct('>BBHH')         # slave, fc, alamat, jumlah/nilai
+_WRITE_MULTIPLE = struct.Struct('>BBHHB')  # slave, fc, alamat, jumlah, byte count
+_PDU = struct.Struct('>BHH')              # fc, alamat, jumlah/nilai
+_words_cache = {}
+
+
+def crc16(data):
+    """CRC16 Modbus (int) untuk bytes, bytearray, atau memoryview."""
+    crc = 0xFFFF
+    table = CRC_TABLE
+    for byte in data:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
+
+def crc_ok(view):
+    """True jika dua byte terakhir `view` adalah CRC yang benar."""
+    n = len(view)
+    return n >= 4 and crc16(view[:n - 2]) == _CRC.unpack_from(view, n - 2)[0]
+
+
+def words_struct(count):
+    """struct.Struct '>nH' yang di-cache per jumlah register."""
+    st = _words_cache.get(count)
+    if st is None:
+        st = _words_cache[count] = struct.Struct(f'>{count}H')
+    return st
+
+
+def pack_pdu(function_code, address, value):
+    """PDU FC01-06: function code + alamat + jumlah/nilai."""
+    return _PDU.pack(function_code, address, value)
+
+
+def unpack_registers(pdu):
+    """PDU respons FC03/04 (fc, byte count, data) -> tuple nilai register."""
+    return words_struct(pdu[1] // 2).unpack_from(pdu, 2)
+
+
+@lru_cache(maxsize=1024)
+def encode_hex_command(command_hex):
+    """
+    Frame RTU lengkap (dengan CRC) untuk perintah heksadesimal GUI, mis. "010660000001".
+
+    Hasilnya di-cache, jadi tombol yang sama tidak mengulang fromhex + CRC.
+    """
+    data = bytes.fromhex(command_hex)
+    return data + _CRC.pack(crc16(data))
+
+
+class FrameCodec:
+    """Buffer kirim/terima yang dipakai ulang untuk satu transport RTU."""
+
+    def __init__(self):
+        self.tx = bytearray(MAX_ADU)
+        self.tx_view = memoryview(self.tx)
+        self.rx = bytearray(MAX_ADU)
+        self.rx_view = memoryview(self.rx)
+
+    def _finish(self, n):
+        _CRC.pack_into(self.tx, n, crc16(self.tx_view[:n]))
+        return self.tx_view[:n + 2]
+
+    def encode(self, slave_id, function_code, address, value):
+        """ADU request FC01-06 (8 byte) di buffer kirim."""
+        _REQUEST.pack_into(self.tx, 0, slave_id, function_code, address, value)
+        return self._finish(6)
+
+    def encode_write_multiple(self, slave_id, address, values):
+        """ADU request FC16 di buffer kirim."""
+        count = len(values)
+        _WRITE_MULTIPLE.pack_into(self.tx, 0, slave_id, 0x10, address, count, 2 * count)
+        words_struct(count).pack_into(self.tx, 7, *values)
+        return self._finish(7 + 2 * count)
+
+    def encode_pdu(self, slave_id, pdu):
+        """ADU request dari PDU sembarang di buffer kirim."""
+        n = len(pdu)
+        self.tx[0] = slave_id
+        self.tx[1:1 + n] = pdu
+        return self._finish(1 + n)
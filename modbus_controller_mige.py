@@ -1,130 +1,65 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import serial
-import serial.tools.list_ports
 import threading
 import time
-import struct
-
-# --- Konstanta Modbus berdasarkan manual ---
-SLAVE_ID = 1
-RPM_CONTROL_ADDR = 0x0089
-SPEED_MONITOR_ADDR = 0x0000
-FORCE_ENABLE_ADDR = 0x0062
-# FORCE_DISABLE_ADDR = 0x0063
+
+from modbus_core import SLAVE_ID, RPM_CONTROL_ADDR, SPEED_MONITOR_ADDR, FORCE_ENABLE_ADDR
+import modbus_core
+from modbus_cache import DriveStateCache, GOOD, signed
+
 RPM_STEP = 100
 
 # --- Variabel Global ---
 ser = None
+cache = None
 is_connected = False
 monitoring_thread = None
 stop_monitoring = False
 
 # --- Fungsi Logika Modbus Manual ---
 
-def calculate_crc(data):
-    """Menghitung CRC16 untuk data Modbus."""
-    crc = 0xFFFF
-    for pos in data:
-        crc ^= pos
-        for _ in range(8):
-            if (crc & 1) != 0:
-                crc >>= 1
-                crc ^= 0xA001
-            else:
-                crc >>= 1
-    return struct.pack('<H', crc)
-
 def send_modbus_request(slave_id, function_code, address, value=None, count=None, custom_data=None):
     """Membangun, mengirim, dan memvalidasi frame Modbus RTU."""
     if not is_connected or not ser:
+        import serial
         raise serial.SerialException("Port serial tidak terhubung.")
 
-    # Membangun PDU (Protocol Data Unit)
-    if function_code == 0x03 or function_code == 0x04:  # Read Holding/Input Registers
-        pdu = struct.pack('>HH', address, count)
-    elif function_code == 0x06:  # Write Single Register
-        pdu = struct.pack('>HH', address, value)
-    elif function_code == 0x42 and custom_data is not None: # Custom function code
-        pdu = custom_data
-    else:
-        raise ValueError("Function code tidak didukung.")
-
-    # Membangun ADU (Application Data Unit)
-    adu = struct.pack('B', slave_id) + struct.pack('B', function_code) + pdu
-    adu += calculate_crc(adu)
-
-    # Mengirim dan menerima data
-    print(f"Sending Modbus Frame: {adu.hex().upper()}") # Print message for debugging
-    ser.reset_input_buffer()
-    ser.reset_output_buffer()
-    ser.write(adu)
-    
-    # Waktu tunggu untuk respons, bisa disesuaikan
-    time.sleep(0.1) 
-    
-    response = ser.read(ser.in_waiting)
-
-    if not response:
-        raise ModbusException("Tidak ada respons dari driver.")
-
-    # Validasi Respons
-    response_crc = response[-2:]
-    response_data = response[:-2]
-    if calculate_crc(response_data) != response_crc:
-        raise ModbusException("CRC respons tidak valid.")
-
-    response_slave_id = response[0]
-    response_fc = response[1]
-
-    if response_slave_id != slave_id:
-        raise ModbusException("Slave ID respons tidak cocok.")
-
-    # Cek error exception dari Modbus
-    if response_fc & 0x80:
-        error_code = response[2]
-        raise ModbusException(f"Driver merespons dengan error code: {error_code}")
-    
-    if response_fc != function_code:
-        raise ModbusException("Function code respons tidak cocok.")
-
-    return response[2:-2] # Kembalikan data payload
-
-class ModbusException(Exception):
-    """Custom exception untuk error Modbus."""
-    pass
+    return modbus_core.send_modbus_request(
+        ser, slave_id, function_code, address,
+        value=value, count=count, custom_data=custom_data
+    )
 
 # --- Fungsi Logika Backend ---
 
-def find_com_ports():
-    """Mencari semua COM port yang tersedia."""
-    ports = serial.tools.list_ports.comports()
-    return [port.device for port in ports]
+def refresh_ports():
+    """Enumerasi port di background, hasilnya diisi ke combobox lewat root.after."""
+    modbus_core.scan_ports_async(lambda ports: root.after(0, set_com_ports, ports))
+
+def set_com_ports(ports):
+    """Mengisi daftar port tanpa menimpa pilihan yang sudah diketik user."""
+    com_port_combo['values'] = ports
+    if ports and not com_port_var.get():
+        com_port_var.set(ports[0])
 
 def connect_modbus():
     """Menghubungkan ke port serial."""
-    global ser, is_connected, stop_monitoring, monitoring_thread
+    global ser, cache, is_connected, stop_monitoring, monitoring_thread
     
     if is_connected:
         messagebox.showinfo("Info", "Sudah terhubung.")
         return
 
     port = com_port_var.get()
-    baudrate = int(baud_var.get())
-    parity = parity_map[parity_var.get()]
-    stopbits = int(stop_bits_var.get())
     
     try:
-        ser = serial.Serial(
-            port=port,
-            baudrate=baudrate,
-            parity=parity,
-            stopbits=stopbits,
-            timeout=1
-        )
-        
-        if not ser.is_open:
-            raise serial.SerialException("Gagal membuka port serial.")
+        # Satu transport (satu lock) untuk perintah tombol dan cache kecepatan
+        ser = modbus_core.as_transport(modbus_core.open_port(
+            port,
+            baudrate=baud_var.get(),
+            parity=parity_var.get(),
+            stopbits=stop_bits_var.get()
+        ))
+        cache = DriveStateCache(ser)
             
         is_connected = True
         status_conn_label.config(text=f"Status: Terhubung ke {port}", foreground="green")
@@ -188,21 +123,12 @@ def monitor_speed():
             if not is_connected:
                 break
                 
-            # Baca register kecepatan (Function Code 0x04)
-            data = send_modbus_request(
-                slave_id=SLAVE_ID,
-                function_code=0x04, 
-                address=SPEED_MONITOR_ADDR,
-                count=1
-            )
-            
-            # Response: [Byte Count, Value High, Value Low]
-            if len(data) >= 3 and data[0] == 2:
-                speed = struct.unpack('>h', data[1:3])[0] # signed 16-bit
-                root.after(0, update_gui_from_thread, actual_rpm_label, f"RPM Aktual: {speed}")
-            else:
-                root.after(0, update_gui_from_thread, actual_rpm_label, "RPM Aktual: Error Baca")
-                
+            # Register kecepatan (FC04) lewat cache: bus hanya dibaca jika nilainya sudah basi
+            speed = cache.read(SLAVE_ID, 0x04, SPEED_MONITOR_ADDR, max_age=0.5)
+            if speed.quality != GOOD:
+                raise modbus_core.ModbusException(cache.error(SLAVE_ID, 0x04, SPEED_MONITOR_ADDR))
+            root.after(0, update_gui_from_thread, actual_rpm_label, f"RPM Aktual: {signed(speed.value)}")
+
         except Exception:
             if is_connected:
                 root.after(0, disconnect_modbus)
@@ -326,12 +252,6 @@ parity_var = tk.StringVar(value="Even")
 stop_bits_var = tk.StringVar(value="1")
 rpm_var = tk.StringVar(value="1000")
 
-parity_map = {
-    "None": "N",
-    "Even": "E",
-    "Odd": "O"
-}
-
 # --- Frame Koneksi ---
 conn_frame = ttk.LabelFrame(root, text="Koneksi Serial")
 conn_frame.pack(fill="x", padx=10, pady=5)
@@ -341,9 +261,6 @@ conn_grid.pack(padx=5, pady=5)
 
 ttk.Label(conn_grid, text="Port:").grid(row=0, column=0, padx=5, sticky="w")
 com_port_combo = ttk.Combobox(conn_grid, textvariable=com_port_var, width=10)
-com_port_combo['values'] = find_com_ports()
-if com_port_combo['values']:
-    com_port_var.set(com_port_combo['values'][0])
 com_port_combo.grid(row=0, column=1, padx=5)
 
 ttk.Label(conn_grid, text="Baud:").grid(row=0, column=2, padx=5, sticky="w")
@@ -421,4 +338,8 @@ control_widgets = [
 # --- Inisialisasi GUI ---
 toggle_controls(False)
 root.protocol("WM_DELETE_WINDOW", on_closing)
-root.mainloop()
+# Enumerasi port setelah jendela tampil, bukan saat layout dibangun
+root.after_idle(refresh_ports)
+
+if __name__ == "__main__":
+    root.mainloop()
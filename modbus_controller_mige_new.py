@@ -1,23 +1,8 @@
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-import serial
-import serial.tools.list_ports
-
-def crc16(data: bytes) -> int:
-    """
-    Menghitung CRC16 untuk data Modbus.
-    """
-    crc = 0xFFFF
-    for pos in data:
-        crc ^= pos
-        for _ in range(8):
-            if (crc & 1) != 0:
-                crc >>= 1
-                crc ^= 0xA001
-            else:
-                crc >>= 1
-    return crc
+import modbus_core
+from modbus_codec import encode_hex_command
 
 class ModbusControllerApp:
     def __init__(self, root):
@@ -43,9 +28,11 @@ class ModbusControllerApp:
         # COM Port
         ttk.Label(settings_frame, text="COM Port:").grid(row=0, column=0, padx=5, pady=5, sticky=tk.W)
         self.com_port_var = tk.StringVar()
-        self.com_port_combo = ttk.Combobox(settings_frame, textvariable=self.com_port_var, state='readonly')
+        # Bisa diketik manual untuk gateway, mis. tcp://192.168.1.50:502 atau rtu+tcp://192.168.1.50:4001
+        self.com_port_combo = ttk.Combobox(settings_frame, textvariable=self.com_port_var)
         self.com_port_combo.grid(row=0, column=1, padx=5, pady=5, sticky=tk.EW)
-        self.refresh_ports()
+        # Enumerasi port setelah jendela tampil, bukan saat layout dibangun
+        self.root.after_idle(self.refresh_ports)
         
         refresh_button = ttk.Button(settings_frame, text="Refresh", command=self.refresh_ports)
         refresh_button.grid(row=0, column=2, padx=5, pady=5)
@@ -166,12 +153,17 @@ class ModbusControllerApp:
         self.send_modbus_command(command)
 
     def refresh_ports(self):
-        ports = [port.device for port in serial.tools.list_ports.comports()]
+        # Enumerasi di thread background; hasilnya kembali ke thread GUI lewat after()
+        modbus_core.scan_ports_async(lambda ports: self.root.after(0, self.set_ports, ports))
+
+    def set_ports(self, ports):
         self.com_port_combo['values'] = ports
-        if ports:
+        if ports and not self.com_port_var.get():
             self.com_port_var.set(ports[0])
 
     def connect(self):
+        import serial
+
         if self.serial_port and self.serial_port.is_open:
             messagebox.showwarning("Warning", "Already connected.")
             return
@@ -188,12 +180,16 @@ class ModbusControllerApp:
         stopbits = stopbits_map[self.stopbits_var.get()]
 
         try:
-            self.serial_port = serial.Serial(port, baud, parity=parity, stopbits=stopbits, timeout=1)
+            if "://" in port:
+                # Transport jaringan dari pool, punya is_open/write/close seperti serial.Serial
+                self.serial_port = modbus_core.open_port(port)
+            else:
+                self.serial_port = serial.Serial(port, baud, parity=parity, stopbits=stopbits, timeout=1)
             self.status_var.set(f"Status: Connected to {port} at {baud} bps")
             self.connect_button.config(state=tk.DISABLED)
             self.disconnect_button.config(state=tk.NORMAL)
             messagebox.showinfo("Success", f"Successfully connected to {port}.")
-        except serial.SerialException as e:
+        except (serial.SerialException, OSError) as e:
             messagebox.showerror("Connection Error", f"Failed to connect to {port}:\n{e}")
             self.serial_port = None
 
@@ -210,15 +206,8 @@ class ModbusControllerApp:
             return
 
         try:
-            # Convert hex string to bytes
-            data = bytes.fromhex(command_hex)
-            
-            # Calculate CRC and append it (little-endian)
-            crc = crc16(data)
-            crc_bytes = crc.to_bytes(2, byteorder='little')
-            
-            # Final command
-            full_command = data + crc_bytes
+            # Frame lengkap dengan CRC, di-cache per perintah
+            full_command = encode_hex_command(command_hex)
             
             # Send the command
             self.serial_port.write(full_command)
@@ -0,0 +1,210 @@
+"""
+Inti komunikasi Modbus RTU untuk driver spindle mige, tanpa ketergantungan GUI.
+
+Modul ini dipakai bersama oleh GUI (modbus_controller_mige.py) dan daemon
+headless (modbus_daemon.py). Tidak ada import tkinter di sini, dan pyserial
+baru di-import saat port benar-benar dibuka. Transport selain serial lokal
+(Modbus TCP, RTU-over-TCP) ada di modbus_transport.py.
+"""
+import struct
+import threading
+
+from modbus_codec import crc16, pack_pdu
+
+# --- Konstanta Modbus berdasarkan manual ---
+SLAVE_ID = 1
+RPM_CONTROL_ADDR = 0x0089
+SPEED_MONITOR_ADDR = 0x0000
+FORCE_ENABLE_ADDR = 0x0062
+# FORCE_DISABLE_ADDR = 0x0063
+
+# Waktu tunggu respons setelah frame dikirim (detik)
+RESPONSE_WAIT = 0.1
+
+PARITY_MAP = {
+    "None": "N",
+    "Even": "E",
+    "Odd": "O"
+}
+
+
+class ModbusException(Exception):
+    """Custom exception untuk error Modbus."""
+    pass
+
+
+class ModbusExceptionResponse(ModbusException):
+    """Driver menjawab dengan exception Modbus; kodenya ada di `code`."""
+
+    def __init__(self, code):
+        super().__init__(f"Driver merespons dengan error code: {code}")
+        self.code = code
+
+
+def calculate_crc(data):
+    """Menghitung CRC16 untuk data Modbus (tabel, lihat modbus_codec.py)."""
+    return struct.pack('<H', crc16(data))
+
+
+def find_com_ports():
+    """Mencari semua COM port yang tersedia."""
+    import serial.tools.list_ports
+
+    ports = serial.tools.list_ports.comports()
+    return [port.device for port in ports]
+
+
+def scan_ports_async(callback):
+    """
+    Enumerasi port di thread background lalu panggil `callback(ports)`.
+
+    Enumerasi bisa makan ratusan milidetik (import pyserial + scan sysfs/registry),
+    jadi GUI memakai ini agar jendela langsung tampil.
+    """
+    def worker():
+        try:
+            ports = find_com_ports()
+        except Exception:
+            ports = []
+        callback(ports)
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    return thread
+
+
+def open_serial(port, baudrate=38400, parity="Even", stopbits=1, timeout=1):
+    """Membuka port serial dengan setting yang sama seperti GUI."""
+    import serial
+
+    ser = serial.Serial(
+        port=port,
+        baudrate=int(baudrate),
+        parity=PARITY_MAP.get(parity, parity),
+        stopbits=int(stopbits),
+        timeout=timeout
+    )
+    if not ser.is_open:
+        raise serial.SerialException("Gagal membuka port serial.")
+    return ser
+
+
+def open_port(port, baudrate=38400, parity="Even", stopbits=1, timeout=1):
+    """
+    Membuka port serial biasa, atau transport dari pool jika `port` berupa URL
+    (tcp://, rtu+tcp://, serial://, lihat modbus_transport.py).
+    """
+    if "://" not in port:
+        return open_serial(port, baudrate, parity, stopbits, timeout)
+
+    import modbus_transport
+    return modbus_transport.open_transport(
+        port, baudrate=baudrate, parity=parity, stopbits=stopbits, timeout=timeout
+    )
+
+
+def as_transport(ser):
+    """Membungkus objek `serial.Serial` biasa menjadi SerialRtuTransport."""
+    if hasattr(ser, "transact"):
+        return ser
+    from modbus_transport import SerialRtuTransport
+    return SerialRtuTransport(ser)
+
+
+def send_modbus_request(ser, slave_id, function_code, address, value=None, count=None, custom_data=None,
+                        values=None):
+    """
+    Membangun, mengirim, dan memvalidasi request Modbus lewat `ser`.
+
+    `ser` boleh objek `serial.Serial` atau transport dari modbus_transport.py.
+    Untuk Write Multiple Registers (0x10) isi `values` dengan list nilai.
+    """
+    # Membangun PDU (Protocol Data Unit)
+    if function_code == 0x03 or function_code == 0x04:  # Read Holding/Input Registers
+        pdu = pack_pdu(function_code, address, count)
+    elif function_code == 0x06:  # Write Single Register
+        pdu = pack_pdu(function_code, address, value)
+    elif function_code == 0x10 and values:  # Write Multiple Registers
+        pdu = struct.pack(f'>BHHB{len(values)}H', function_code, address, len(values), 2 * len(values), *values)
+    elif function_code == 0x42 and custom_data is not None: # Custom function code
+        pdu = struct.pack('B', function_code) + custom_data
+    else:
+        raise ValueError("Function code tidak didukung.")
+
+    response = as_transport(ser).transact(slave_id, pdu)
+    response_fc = response[0]
+
+    # Cek error exception dari Modbus
+    if response_fc & 0x80:
+        raise ModbusExceptionResponse(response[1])
+
+    if response_fc != function_code:
+        raise ModbusException("Function code respons tidak cocok.")
+
+    return response[1:] # Kembalikan data payload
+
+
+class SpindleDrive:
+    """
+    Perintah tingkat tinggi untuk satu driver mige di atas satu port serial
+    atau transport.
+
+    Semua akses bus melewati `self.lock`, sehingga thread monitor dan
+    beberapa klien perintah bisa memakai port yang sama dengan aman.
+    """
+
+    def __init__(self, ser, slave_id=SLAVE_ID):
+        self.ser = as_transport(ser)
+        self.slave_id = slave_id
+        self.lock = threading.Lock()
+        self.rpm = 0
+
+    def request(self, function_code, address, value=None, count=None):
+        with self.lock:
+            return send_modbus_request(
+                self.ser,
+                slave_id=self.slave_id,
+                function_code=function_code,
+                address=address,
+                value=value,
+                count=count
+            )
+
+    def enable(self):
+        """Mengirim perintah Enable Drive (Servo ON)."""
+        self.request(0x06, FORCE_ENABLE_ADDR, value=1)
+
+    def disable(self):
+        """Mengirim perintah Disable Drive (Servo OFF)."""
+        self.request(0x06, FORCE_ENABLE_ADDR, value=0)
+
+    def set_rpm(self, rpm):
+        """Enable drive lalu kirim RPM (nilai negatif = mundur / CW)."""
+        rpm = int(rpm)
+        self.enable()
+        # Register RPM 16-bit, nilai negatif dikirim sebagai two's complement
+        self.request(0x06, RPM_CONTROL_ADDR, value=rpm & 0xFFFF)
+        self.rpm = rpm
+
+    def set_direction(self, direction, rpm=None):
+        """Set arah putar seperti tombol CW/CCW di GUI, default 1000 RPM."""
+        rpm = abs(int(rpm if rpm is not None else self.rpm))
+        if rpm == 0:
+            rpm = 1000
+        self.set_rpm(-rpm if direction == 'cw' else rpm)
+
+    def stop(self):
+        """Mengirim 0 RPM lalu disable drive."""
+        self.request(0x06, RPM_CONTROL_ADDR, value=0)
+        self.disable()
+        self.rpm = 0
+
+    def read_speed(self):
+        """Membaca kecepatan aktual (Function Code 0x04), signed 16-bit."""
+        with self.lock:
+            speed = self.ser.read_registers(self.slave_id, 0x04, SPEED_MONITOR_ADDR, 1)[0]
+        return speed - 0x10000 if speed & 0x8000 else speed
+
+    def close(self):
+        if self.ser and self.ser.is_open:
+            self.ser.close()
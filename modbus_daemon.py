@@ -0,0 +1,360 @@
+"""
+Daemon headless untuk kontrol spindle mige lewat Unix socket.
+
+Memakai inti Modbus yang sama dengan GUI (modbus_core.py) tanpa import
+tkinter, sehingga bisa jalan sebagai service di samping LinuxCNC.
+
+Protokol socket berbasis baris teks, setiap balasan adalah satu baris JSON:
+
+    rpm <nilai>     kirim RPM (negatif = mundur / CW)
+    cw [rpm]        putar kanan
+    ccw [rpm]       putar kiri
+    stop            hentikan spindle dan disable drive
+    status          baca status terakhir
+    faults          riwayat alarm / fault drive
+    read <fc> <alamat> [umur]
+                    baca register lewat cache; bus hanya dibaca jika nilai
+                    cache lebih tua dari `umur` detik (default 1.0)
+    watch           stream telemetri sampai koneksi ditutup
+
+Kecepatan dipolling sekali oleh PollScheduler ke DriveStateCache
+(modbus_cache.py); status dan semua klien membaca dari cache itu.
+Register fault dipantau FaultMonitor (modbus_faults.py): lambat saat diam,
+cepat saat spindle berputar; trip langsung dikirim ke klien `watch`.
+
+Contoh:
+    python modbus_daemon.py serve --port /dev/ttyUSB1
+    python modbus_daemon.py serve --port /dev/ttyUSB1 --journal /var/log/spindle.mbj
+    python modbus_daemon.py serve --port /dev/ttyUSB1 --fault-profile mige --fault-log /var/log/spindle-fault.jsonl --hal
+    python modbus_daemon.py serve --port /dev/ttyUSB1 --archive /var/lib/spindle.mba
+    python modbus_daemon.py ctl cw 1500
+    echo status | socat - UNIX-CONNECT:/tmp/mill-vfd-modbus.sock
+"""
+import argparse
+import json
+import os
+import queue
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+import modbus_core
+from modbus_cache import DriveStateCache, GOOD, PollScheduler, signed
+from modbus_faults import FAULT_PROFILES, FaultHistory, FaultMonitor, create_hal_component
+from modbus_journal import Journal
+from modbus_timing import LineConfig, Poll, UtilisationMeter
+
+DEFAULT_SOCKET = "/tmp/mill-vfd-modbus.sock"
+
+
+def apply_command(drive, cmd, args):
+    """Menjalankan satu perintah spindle (rpm/cw/ccw/stop/status) pada SpindleDrive."""
+    if cmd == "rpm":
+        if len(args) != 1:
+            raise ValueError("Format: rpm <nilai>")
+        drive.set_rpm(int(args[0]))
+    elif cmd in ("cw", "ccw"):
+        drive.set_direction(cmd, int(args[0]) if args else None)
+    elif cmd == "stop":
+        drive.stop()
+    elif cmd != "status":
+        raise ValueError(f"Perintah tidak dikenal: {cmd}")
+
+
+class SpindleService:
+    """Menyimpan status drive dan menjalankan polling kecepatan di background."""
+
+    def __init__(self, drive, interval=1.0):
+        self.drive = drive
+        self.interval = interval
+        self.status = {"connected": True, "rpm_set": 0, "rpm_actual": None, "error": None, "time": None}
+        self.status_lock = threading.Lock()
+        self.watchers = []
+        self.cache = DriveStateCache(drive.ser)
+        self.speed_poll = Poll(drive.slave_id, 0x04, modbus_core.SPEED_MONITOR_ADDR, 1, 1.0 / interval)
+        self.scheduler = PollScheduler(self.cache, [self.speed_poll], on_update=self.on_poll)
+        self.faults = None
+        self.archive = None
+
+    def add_fault_monitor(self, monitor):
+        self.faults = monitor
+        monitor.add_listener(self.on_fault)
+
+    def is_running(self):
+        """
+        Spindle berputar menurut kecepatan aktual hasil baca balik, bukan setpoint:
+        saat coast-down setelah stop atau trip, setpoint sudah 0 tapi motor masih
+        berputar. Jika kecepatan aktual belum/tidak terbaca, pakai setpoint.
+        """
+        poll = self.speed_poll
+        entry = self.cache.peek(poll.slave, poll.function, poll.address, max_age=3 * self.interval)
+        if entry.quality != GOOD:
+            return self.drive.rpm != 0
+        return signed(entry.value) != 0
+
+    def start(self):
+        self.scheduler.start()
+        if self.faults is not None:
+            self.faults.start()
+
+    def shutdown(self):
+        self.scheduler.stop()
+        if self.faults is not None:
+            self.faults.stop()
+        try:
+            self.drive.stop()
+        except Exception:
+            pass
+        self.drive.close()
+
+    def on_poll(self, poll, ok):
+        """Dipanggil PollScheduler setelah kecepatan dibaca; sebarkan telemetri."""
+        poll_key = (poll.slave, poll.function, poll.address)
+        entry = self.cache.peek(*poll_key)
+        # Service tetap jalan; error dicatat di status dan dicoba lagi
+        self.update_status(rpm_actual=signed(entry.value) if ok else None, error=self.cache.error(*poll_key))
+        if ok and self.archive is not None:
+            # Kecepatan aktual, setpoint, dan kode fault terakhir diarsip per poll
+            slave = self.drive.slave_id
+            self.archive.append(*poll_key, signed(entry.value))
+            self.archive.append(slave, 0x03, modbus_core.RPM_CONTROL_ADDR, self.drive.rpm)
+            if self.faults is not None and self.faults.code is not None:
+                self.archive.append(slave, self.faults.function_code, self.faults.address, self.faults.code)
+        elif self.archive is not None:
+            # Tanpa sampel baru checkpoint tetap ditulis, sampel terakhir tidak tertahan di memori
+            self.archive.checkpoint()
+
+    def on_fault(self, event):
+        """Dipanggil FaultMonitor saat kode fault berubah; langsung diteruskan ke watcher."""
+        if event.code or event.previous:
+            print(f"Fault drive: {event.name} (kode {event.code})", flush=True)
+        self.update_status(fault={"code": event.code, "name": event.name})
+
+    def update_status(self, **fields):
+        with self.status_lock:
+            self.status.update(fields)
+            self.status["rpm_set"] = self.drive.rpm
+            self.status["time"] = time.time()
+            snapshot = dict(self.status)
+            watchers = list(self.watchers)
+        for q in watchers:
+            try:
+                q.put_nowait(snapshot)
+            except queue.Full:
+                pass  # Klien lambat, lewati sampel ini
+
+    def get_status(self):
+        with self.status_lock:
+            status = dict(self.status)
+        meter = self.drive.ser.meter
+        if meter is not None:
+            status["bus"] = meter.snapshot()
+        status["cache"] = self.cache.stats()
+        if self.faults is not None:
+            status["fault"] = self.faults.status()
+        return status
+
+    def add_watcher(self):
+        q = queue.Queue(maxsize=100)
+        with self.status_lock:
+            self.watchers.append(q)
+        return q
+
+    def remove_watcher(self, q):
+        with self.status_lock:
+            if q in self.watchers:
+                self.watchers.remove(q)
+
+    def execute(self, line):
+        """Menjalankan satu perintah teks dan mengembalikan dict balasan."""
+        parts = line.split()
+        if not parts:
+            raise ValueError("Perintah kosong.")
+        if parts[0].lower() == "read":
+            return self.read_register(parts[1:])
+        if parts[0].lower() == "faults":
+            return {"history": self.faults.history.recent() if self.faults is not None else []}
+        apply_command(self.drive, parts[0].lower(), parts[1:])
+        if self.faults is not None:
+            # Periode poll fault ikut status putar yang baru tanpa menunggu
+            self.faults.wake()
+
+        with self.status_lock:
+            self.status["rpm_set"] = self.drive.rpm
+        return self.get_status()
+
+    def read_register(self, args):
+        """`read <fc> <alamat> [umur]`: nilai register dari cache dengan umur maksimum."""
+        if len(args) not in (2, 3):
+            raise ValueError("Format: read <fc 3|4> <alamat> [umur detik]")
+        function_code, address = int(args[0], 0), int(args[1], 0)
+        if function_code not in (0x03, 0x04):
+            raise ValueError("Hanya FC03 / FC04 yang bisa dibaca lewat cache.")
+        max_age = float(args[2]) if len(args) == 3 else 1.0
+        entry = self.cache.read(self.drive.slave_id, function_code, address, max_age)
+        if entry.quality != GOOD:
+            raise modbus_core.ModbusException(self.cache.error(self.drive.slave_id, function_code, address))
+        return {
+            "function": function_code,
+            "address": address,
+            "value": entry.value,
+            "age": round(time.monotonic() - entry.time, 3),
+            "cache": self.cache.stats(),
+        }
+
+
+class CommandHandler(socketserver.StreamRequestHandler):
+    """Satu koneksi klien; satu perintah per baris."""
+
+    def handle(self):
+        service = self.server.service
+        for raw in self.rfile:
+            line = raw.decode("utf-8", "replace").strip()
+            if not line:
+                continue
+            if line.lower() == "watch":
+                self.stream(service)
+                return
+            try:
+                reply = {"ok": True, "status": service.execute(line)}
+            except Exception as e:
+                reply = {"ok": False, "error": str(e)}
+            self.send(reply)
+
+    def stream(self, service):
+        q = service.add_watcher()
+        try:
+            self.send({"ok": True, "status": service.get_status()})
+            while True:
+                self.send({"ok": True, "status": q.get()})
+        except OSError:
+            pass  # Klien menutup koneksi
+        finally:
+            service.remove_watcher(q)
+
+    def send(self, reply):
+        self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, service):
+        self.service = service
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, CommandHandler)
+
+
+def stop_on_sigterm(server):
+    """SIGTERM (systemd stop, kill) menjalankan jalur cleanup yang sama dengan Ctrl-C."""
+    def handler(signum, frame):
+        # shutdown() menunggu serve_forever() selesai, jadi harus dari thread lain
+        threading.Thread(target=server.shutdown, daemon=True).start()
+    signal.signal(signal.SIGTERM, handler)
+
+
+def serve(args):
+    ser = modbus_core.open_port(args.port, args.baud, args.parity, args.stopbits)
+    drive = modbus_core.SpindleDrive(ser, slave_id=args.slave)
+    drive.ser.meter = UtilisationMeter(LineConfig(args.baud, args.parity, args.stopbits))
+    journal = None
+    if args.journal:
+        # Journal menggantikan print frame di stdout
+        journal = Journal(args.journal, max_bytes=args.journal_size * 1024 * 1024)
+        drive.ser.journal = journal
+        drive.ser.verbose = False
+    service = SpindleService(drive, interval=args.interval)
+    if args.fault_profile != "none":
+        service.add_fault_monitor(FaultMonitor(
+            service.cache, drive.slave_id, args.fault_profile,
+            is_running=service.is_running,
+            idle_period=args.fault_idle,
+            run_period=args.fault_run,
+            history=FaultHistory(args.fault_log),
+            hal_component=create_hal_component() if args.hal else None,
+        ))
+    if args.archive:
+        # Modul arsip hanya dimuat jika dipakai; startup daemon tetap ringan
+        from modbus_archive import TelemetryArchive
+        service.archive = TelemetryArchive(args.archive, chunk_seconds=args.archive_chunk,
+                                           flush_seconds=args.archive_flush)
+    server = DaemonServer(args.socket, service)
+    service.start()
+    stop_on_sigterm(server)
+    print(f"Daemon siap: {args.port} -> {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+        if journal is not None:
+            journal.close()
+        if service.archive is not None:
+            service.archive.close()
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+def ctl(args):
+    """Klien sederhana: kirim satu perintah dan cetak balasannya."""
+    line = " ".join(args.command)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(args.socket)
+        sock.sendall(line.encode("utf-8") + b"\n")
+        f = sock.makefile("rb")
+        ok = True
+        for raw in f:
+            sys.stdout.write(raw.decode("utf-8"))
+            sys.stdout.flush()
+            ok = json.loads(raw).get("ok", False)
+            if line.strip().lower() != "watch":
+                break
+    return 0 if ok else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Daemon kontrol spindle Modbus tanpa GUI.")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Path Unix socket")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    p_serve = sub.add_parser("serve", help="Jalankan daemon")
+    p_serve.add_argument("--port", required=True, help="Port serial atau URL, mis. /dev/ttyUSB1, tcp://10.0.0.5:502, rtu+tcp://10.0.0.5:4001")
+    p_serve.add_argument("--baud", type=int, default=38400)
+    p_serve.add_argument("--parity", default="Even", choices=["None", "Even", "Odd"])
+    p_serve.add_argument("--stopbits", type=int, default=1, choices=[1, 2])
+    p_serve.add_argument("--slave", type=int, default=modbus_core.SLAVE_ID)
+    p_serve.add_argument("--interval", type=float, default=1.0, help="Periode polling kecepatan (detik)")
+    p_serve.add_argument("--journal", help="Catat semua frame ke file journal biner")
+    p_serve.add_argument("--journal-size", type=int, default=16, help="Ukuran rotasi journal (MB)")
+    p_serve.add_argument("--fault-profile", default="none", choices=sorted(FAULT_PROFILES) + ["none"],
+                         help="Peta register fault drive (cocokkan dulu dengan manual drive); "
+                              "default 'none' = monitor fault mati")
+    p_serve.add_argument("--fault-idle", type=float, default=2.0, help="Periode poll fault saat diam (detik)")
+    p_serve.add_argument("--fault-run", type=float, default=0.1, help="Periode poll fault saat berputar (detik)")
+    p_serve.add_argument("--fault-log", help="File riwayat fault (JSON lines)")
+    p_serve.add_argument("--archive", help="Arsip telemetri jangka panjang (modbus_archive.py)")
+    p_serve.add_argument("--archive-chunk", type=float, default=600, help="Rentang satu chunk arsip (detik)")
+    p_serve.add_argument("--archive-flush", type=float, default=5.0,
+                         help="Interval checkpoint chunk terbuka; batas data hilang saat crash (detik)")
+    p_serve.add_argument("--hal", action="store_true",
+                         help="Buat pin HAL mill-vfd-fault.fault / fault-code / comm-ok (butuh LinuxCNC)")
+
+    p_ctl = sub.add_parser("ctl", help="Kirim perintah ke daemon yang sedang jalan")
+    p_ctl.add_argument("command", nargs="+", help="mis. status, rpm 1200, cw, stop, watch")
+
+    args = parser.parse_args(argv)
+    if args.mode == "serve":
+        serve(args)
+        return 0
+    return ctl(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""
+Monitor alarm / fault drive: polling adaptif, notifikasi event, pin HAL, dan riwayat.
+
+Register fault dibaca dengan periode lambat saat spindle diam dan periode
+cepat saat spindle berputar, sehingga trip drive terdeteksi dalam satu
+siklus poll tanpa membebani bus terus-menerus. Setiap perubahan kode
+fault didekode menjadi nama alarm dari profil drive lalu:
+
+    - memanggil callback yang terdaftar (add_listener)
+    - mengisi pin HAL jika modul `hal` LinuxCNC tersedia
+    - ditambahkan ke riwayat (di memori dan file JSON lines opsional)
+
+Alamat register dan tabel alarm di FAULT_PROFILES adalah default yang
+dipakai juga oleh simulator (modbus_server.py); cocokkan dengan manual
+drive sebelum dipakai di mesin.
+"""
+import json
+import threading
+import time
+from collections import deque, namedtuple
+
+FAULT_PROFILES = {
+    "mige": {
+        "function": 0x04,
+        "address": 0x0001,
+        "alarms": {
+            1: "Overcurrent",
+            2: "Overvoltage",
+            3: "Undervoltage",
+            4: "Overload",
+            5: "Overspeed",
+            6: "Encoder fault",
+            7: "Speed deviation too large",
+            8: "Drive overheat",
+            9: "EEPROM error",
+            10: "Communication timeout",
+        },
+    },
+    "lincnc": {
+        "function": 0x03,
+        "address": 0x0109,
+        "alarms": {
+            1: "Overcurrent (accel)",
+            2: "Overcurrent (decel)",
+            3: "Overcurrent (constant speed)",
+            4: "Overvoltage",
+            5: "Undervoltage",
+            6: "Motor overload",
+            7: "Inverter overheat",
+            8: "Input phase loss",
+            9: "Output phase loss",
+            10: "External fault",
+        },
+    },
+}
+
+FaultEvent = namedtuple("FaultEvent", "time code previous name")
+
+
+def alarm_name(profile, code):
+    """Kode fault -> nama alarm ('OK' untuk 0)."""
+    if code == 0:
+        return "OK"
+    return FAULT_PROFILES[profile]["alarms"].get(code, f"Alarm tidak dikenal ({code})")
+
+
+def create_hal_component(name="mill-vfd-fault"):
+    """
+    Komponen HAL dengan pin `fault` (bit), `fault-code` (s32), dan `comm-ok` (bit).
+
+    Mengembalikan None jika modul `hal` tidak ada (di luar LinuxCNC).
+    """
+    try:
+        import hal
+    except ImportError:
+        return None
+    comp = hal.component(name)
+    comp.newpin("fault", hal.HAL_BIT, hal.HAL_OUT)
+    comp.newpin("fault-code", hal.HAL_S32, hal.HAL_OUT)
+    comp.newpin("comm-ok", hal.HAL_BIT, hal.HAL_OUT)
+    comp.ready()
+    return comp
+
+
+class FaultHistory:
+    """Riwayat event fault: N terakhir di memori, semuanya ke file JSON lines jika `path` diisi."""
+
+    def __init__(self, path=None, size=100):
+        self.path = path
+        self.events = deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    def append(self, event):
+        record = {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(event.time)),
+            "code": event.code,
+            "previous": event.previous,
+            "name": event.name,
+        }
+        with self.lock:
+            self.events.append(record)
+            if self.path:
+                with open(self.path, 'a') as f:
+                    f.write(json.dumps(record) + "\n")
+
+    def recent(self):
+        with self.lock:
+            return list(self.events)
+
+
+class FaultMonitor:
+    """
+    Polling register fault satu slave lewat DriveStateCache (modbus_cache.py).
+
+    `is_running()` menentukan periode: `run_period` saat True, `idle_period`
+    saat False. Panggil wake() setelah perintah start agar periode cepat
+    langsung berlaku tanpa menunggu sisa periode lambat.
+    """
+
+    def __init__(self, cache, slave_id, profile="mige", is_running=None, idle_period=2.0, run_period=0.1,
+                 history=None, hal_component=None):
+        self.cache = cache
+        self.slave_id = slave_id
+        self.profile = profile
+        self.function_code = FAULT_PROFILES[profile]["function"]
+        self.address = FAULT_PROFILES[profile]["address"]
+        self.is_running = is_running or (lambda: False)
+        self.idle_period = idle_period
+        self.run_period = run_period
+        self.history = history or FaultHistory()
+        self.hal = hal_component
+        self.code = None
+        self.comm_ok = False
+        self.listeners = []
+        self.wake_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def add_listener(self, callback):
+        """`callback(FaultEvent)` dipanggil di thread monitor setiap kode fault berubah."""
+        self.listeners.append(callback)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.wake_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=self.idle_period + 1.5)
+
+    def wake(self):
+        self.wake_event.set()
+
+    def period(self):
+        return self.run_period if self.is_running() else self.idle_period
+
+    def run(self):
+        while not self.stop_event.is_set():
+            self.poll()
+            self.wake_event.wait(self.period())
+            self.wake_event.clear()
+
+    def poll(self):
+        """Satu kali baca register fault; mengembalikan FaultEvent jika kodenya berubah."""
+        ok = self.cache.refresh(self.slave_id, self.function_code, self.address)
+        self.comm_ok = ok
+        if self.hal is not None:
+            self.hal["comm-ok"] = ok
+        if not ok:
+            # Gagal komunikasi bukan fault drive; kode terakhir dipertahankan
+            return None
+        code = self.cache.peek(self.slave_id, self.function_code, self.address).value
+        if code == self.code:
+            return None
+
+        event = FaultEvent(time.time(), code, self.code, alarm_name(self.profile, code))
+        self.code = code
+        if self.hal is not None:
+            self.hal["fault"] = code != 0
+            self.hal["fault-code"] = code
+        self.history.append(event)
+        for callback in list(self.listeners):
+            try:
+                callback(event)
+            except Exception:
+                pass  # Listener yang error tidak boleh menghentikan monitor
+        return event
+
+    def status(self):
+        return {
+            "code": self.code,
+            "name": alarm_name(self.profile, self.code) if self.code is not None else None,
+            "comm_ok": self.comm_ok,
+            "period": self.period(),
+        }
@@ -0,0 +1,246 @@
+"""
+Journal biner semua transaksi Modbus: jejak audit lengkap dengan overhead minimal.
+
+Pengganti print "Sending Modbus Frame" di jalur kirim. Setiap frame ditulis
+sebagai satu record dengan layout tetap, di-buffer di memori, di-flush
+berkala oleh thread latar, dan file dirotasi berdasarkan ukuran
+(journal.mbj -> journal.mbj.1 -> ...).
+
+Layout file (little-endian):
+
+    header  : magic "MBJ1", waktu wall-clock (double), waktu monotonic (double) saat file dibuka
+    record  : time (double, monotonic), direction (u8), slave (u8), function (u8),
+              panjang frame (u16), latensi (float, detik), lalu frame mentah
+
+`direction` = TX (0) atau RX (1), ditambah flag PDU (2) jika frame disimpan
+tanpa slave id / CRC (transport Modbus TCP). Record RX dengan frame kosong
+berarti timeout.
+
+Journal dibaca kembali dengan read_journal(); iter_frames() dan
+iter_transactions() mengubahnya menjadi Frame / Transaction modbus_capture
+sehingga analyzer, replay, server --replay, dan model timing bisa langsung
+memakai file journal seperti file capture.
+
+Contoh:
+    python modbus_daemon.py serve --port /dev/ttyUSB1 --journal /var/log/spindle.mbj
+    python modbus_journal.py /var/log/spindle.mbj --tail 20
+    python modbus_analyzer.py /var/log/spindle.mbj
+"""
+import argparse
+import os
+import struct
+import sys
+import threading
+import time
+from collections import namedtuple
+
+import modbus_capture
+from modbus_core import calculate_crc
+
+MAGIC = b"MBJ1"
+TX = 0
+RX = 1
+PDU = 2
+
+_HEADER = struct.Struct('<4sdd')
+_RECORD = struct.Struct('<dBBBHf')
+
+JournalRecord = namedtuple("JournalRecord", "time direction slave function latency frame")
+
+
+class Journal:
+    """
+    Penulis journal. Aman dipakai beberapa thread sekaligus; pasang ke
+    transport lewat atribut `journal`.
+    """
+
+    def __init__(self, path, max_bytes=16 * 1024 * 1024, backups=5, flush_interval=1.0,
+                 buffer_size=64 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.buffer_size = buffer_size
+        self.lock = threading.Lock()
+        self.records = 0
+        self.file = None
+        self._open()
+
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, args=(flush_interval,), daemon=True)
+        self._flusher.start()
+
+    def _open(self):
+        self.file = open(self.path, 'ab', buffering=self.buffer_size)
+        self.size = self.file.tell()
+        if self.size == 0:
+            self.file.write(_HEADER.pack(MAGIC, time.time(), time.monotonic()))
+            self.size = _HEADER.size
+
+    def _rotate(self):
+        self.file.close()
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def _flush_loop(self, interval):
+        while not self._stop.wait(interval):
+            self.flush()
+
+    def record(self, direction, frame, latency=0.0, now=None):
+        """Mencatat satu ADU RTU (slave id + PDU + CRC)."""
+        slave = frame[0] if frame else 0
+        function = frame[1] if len(frame) > 1 else 0
+        self._write(direction, slave, function, frame, latency, now)
+
+    def record_pdu(self, direction, slave, pdu, latency=0.0, now=None):
+        """Mencatat satu PDU Modbus TCP (tanpa slave id / CRC)."""
+        self._write(direction | PDU, slave, pdu[0] if pdu else 0, pdu, latency, now)
+
+    def _write(self, direction, slave, function, frame, latency, now):
+        if now is None:
+            now = time.monotonic()
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(_RECORD.pack(now, direction, slave, function, len(frame), latency))
+            self.file.write(frame)
+            self.records += 1
+            self.size += _RECORD.size + len(frame)
+            if self.size >= self.max_bytes:
+                self._rotate()
+
+    def flush(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.flush()
+
+    def close(self):
+        self._stop.set()
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def is_journal(path):
+    """True jika file diawali magic journal."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def read_journal(path):
+    """Menghasilkan JournalRecord dari satu file journal; record terakhir yang terpotong diabaikan."""
+    with open(path, 'rb') as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size or header[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} bukan file journal Modbus.")
+        while True:
+            raw = f.read(_RECORD.size)
+            if len(raw) < _RECORD.size:
+                return
+            t, direction, slave, function, length, latency = _RECORD.unpack(raw)
+            frame = f.read(length)
+            if len(frame) < length:
+                return
+            yield JournalRecord(t, direction, slave, function, latency, frame)
+
+
+def to_adu(record):
+    """Frame record dalam bentuk ADU RTU (PDU TCP diberi slave id dan CRC)."""
+    if record.direction & PDU and record.frame:
+        adu = bytes((record.slave,)) + record.frame
+        return adu + calculate_crc(adu)
+    return record.frame
+
+
+def iter_frames(records, baudrate=modbus_capture.DEFAULT_BAUDRATE):
+    """
+    JournalRecord -> modbus_capture.Frame.
+
+    Record TX dicatat saat frame mulai dikirim, record RX saat respons selesai
+    diterima; durasi frame dihitung dari air-time pada `baudrate`.
+    """
+    char = modbus_capture.char_time(baudrate)
+    for record in records:
+        if not record.frame:
+            continue
+        data = to_adu(record)
+        air = len(data) * char
+        if record.direction & RX:
+            yield modbus_capture.Frame(record.time - air, record.time, data, 0)
+        else:
+            yield modbus_capture.Frame(record.time, record.time + air, data, 0)
+
+
+def iter_transactions(records, baudrate=modbus_capture.DEFAULT_BAUDRATE, timeout=1.5):
+    """
+    JournalRecord -> modbus_capture.Transaction.
+
+    Berbeda dengan capture, arah setiap frame sudah tercatat, jadi respons
+    dipasangkan ke request tertua yang belum dijawab dengan slave dan
+    function code yang sama (juga benar untuk transaksi TCP yang tumpang
+    tindih). Request tanpa respons dalam `timeout` menghasilkan response=None.
+    """
+    char = modbus_capture.char_time(baudrate)
+    pending = []
+    for record in records:
+        # Request yang sudah lewat timeout tidak akan dijawab lagi
+        while pending and record.time - pending[0].end > timeout:
+            yield modbus_capture.Transaction(pending.pop(0), None)
+
+        if not record.direction & RX:
+            if record.frame:
+                data = to_adu(record)
+                pending.append(modbus_capture.Frame(record.time, record.time + len(data) * char, data, 0))
+            continue
+
+        if not record.frame:
+            # Timeout: RTU tidak tahu slave-nya, TCP tahu
+            match = next((f for f in pending if not record.direction & PDU or f.data[0] == record.slave), None)
+            if match is not None:
+                pending.remove(match)
+                yield modbus_capture.Transaction(match, None)
+            continue
+
+        data = to_adu(record)
+        match = next((f for f in pending if f.data[0] == data[0] and f.data[1] == data[1] & 0x7F), None)
+        if match is None:
+            continue  # Respons dari request sebelum awal file (mis. setelah rotasi)
+        pending.remove(match)
+        response = modbus_capture.Frame(record.time - len(data) * char, record.time, data, 0)
+        yield modbus_capture.Transaction(match, response)
+
+    for frame in pending:
+        yield modbus_capture.Transaction(frame, None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tampilkan isi journal transaksi Modbus.")
+    parser.add_argument("journal", nargs="+", help="File journal (urutkan dari yang paling lama)")
+    parser.add_argument("--tail", type=int, default=0, help="Hanya N record terakhir")
+    args = parser.parse_args(argv)
+
+    records = [record for path in args.journal for record in read_journal(path)]
+    if args.tail:
+        records = records[-args.tail:]
+    origin = records[0].time if records else 0.0
+    for record in records:
+        arrow = "<-" if record.direction & RX else "->"
+        frame = record.frame.hex().upper() or "(timeout)"
+        latency = f"{record.latency * 1000:8.2f} ms" if record.direction & RX else " " * 11
+        print(f"{record.time - origin:12.6f} {arrow} slave {record.slave:3d} fc {record.function:02X} "
+              f"{latency}  {frame}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,401 @@
+"""
+Controller multi-bus: satu proses mengendalikan beberapa bus RS-485 sekaligus.
+
+Setiap bus (adapter USB-RS485, atau gateway rtu+tcp:// / tcp://) punya
+thread I/O sendiri yang memegang port-nya, menjalankan antrean perintah,
+dan mem-polling kecepatan semua spindle di bus itu. Perintah dari klien
+menunggu dengan batas waktu, jadi adapter yang macet hanya membuat
+perintah ke bus itu gagal; bus lain tetap berjalan. Karena bus berjalan
+paralel, throughput total naik sebanding jumlah adapter.
+
+Protokol socket sama dengan modbus_daemon.py, dengan nama spindle di depan:
+
+    <spindle> rpm <nilai> | cw [rpm] | ccw [rpm] | stop
+    all stop        perintah ke semua spindle (paralel per bus)
+    status          telemetri gabungan semua spindle dan bus
+    watch           stream telemetri gabungan
+
+Contoh:
+    python modbus_multibus.py serve --spindle x=/dev/ttyUSB0@1 --spindle y=/dev/ttyUSB0@2 \\
+        --spindle z=rtu+tcp://192.168.1.50:4001@1
+    python modbus_multibus.py ctl x cw 1500
+    python modbus_multibus.py ctl all stop
+"""
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+import modbus_core
+from modbus_core import ModbusException
+from modbus_daemon import DaemonServer, apply_command, ctl, stop_on_sigterm
+from modbus_journal import Journal
+from modbus_timing import LineConfig, UtilisationMeter
+
+DEFAULT_SOCKET = "/tmp/mill-vfd-multibus.sock"
+
+
+class BusWorker:
+    """
+    Satu bus dengan thread I/O sendiri.
+
+    Semua akses port terjadi di thread ini; thread lain hanya menaruh
+    perintah ke antrean lewat submit(). Jika port hilang (adapter dicabut),
+    worker menutupnya dan mencoba membuka lagi setiap `reconnect_delay` detik.
+    """
+
+    def __init__(self, name, port, slaves, interval=1.0, on_status=None, reconnect_delay=2.0,
+                 journal=None, **options):
+        self.name = name
+        self.port = port
+        self.slaves = dict(slaves)   # nama spindle -> slave id
+        self.interval = interval
+        self.on_status = on_status
+        self.reconnect_delay = reconnect_delay
+        self.journal = journal
+        self.options = options
+        self.transport = None
+        self.drives = {}
+        self.commands = queue.Queue()
+        self.error = None
+        self.busy_since = None
+        self.transactions = 0
+        self.last_ok = None          # monotonic transaksi terakhir yang dijawab
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name=f"bus-{name}", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def submit(self, spindle, fn, deadline=None):
+        """
+        Menjadwalkan `fn(drive)` di thread bus; hasilnya Future.
+
+        Jika `deadline` (time.monotonic) sudah lewat saat giliran perintah
+        tiba, perintah tidak dikirim ke drive dan Future gagal.
+        """
+        fut = Future()
+        self.commands.put((spindle, fn, fut, deadline))
+        return fut
+
+    @property
+    def connected(self):
+        """Bus dianggap tersambung jika ada transaksi yang dijawab dalam beberapa interval terakhir."""
+        last_ok = self.last_ok
+        if self.transport is None or last_ok is None:
+            return False
+        return time.monotonic() - last_ok <= max(3 * self.interval, self.reconnect_delay)
+
+    def _connect(self):
+        port = modbus_core.open_port(self.port, **self.options)
+        transport = modbus_core.as_transport(port)
+        transport.verbose = False
+        transport.journal = self.journal
+        transport.meter = UtilisationMeter(LineConfig(
+            self.options.get("baudrate", 38400),
+            self.options.get("parity", "Even"),
+            self.options.get("stopbits", 1),
+        ))
+        self.transport = transport
+        self.drives = {spindle: modbus_core.SpindleDrive(transport, slave) for spindle, slave in self.slaves.items()}
+        self.error = None
+
+    def _disconnect(self):
+        transport, self.transport = self.transport, None
+        if transport is not None:
+            try:
+                transport.close()
+            except Exception:
+                pass
+
+    def _io(self, fn, *args):
+        """Satu operasi bus; port yang rusak ditutup agar dibuka ulang."""
+        self.busy_since = time.monotonic()
+        try:
+            result = fn(*args)
+            self.last_ok = time.monotonic()
+            return result
+        except OSError as e:
+            # SerialException juga turunan OSError: port hilang / adapter dicabut
+            self._disconnect()
+            self.error = str(e)
+            raise ModbusException(f"Bus {self.name}: {e}")
+        finally:
+            self.busy_since = None
+            self.transactions += 1
+
+    def _fail_pending(self, error):
+        while True:
+            try:
+                _, _, fut, _ = self.commands.get_nowait()
+            except queue.Empty:
+                return
+            if fut.set_running_or_notify_cancel():
+                fut.set_exception(error)
+
+    def run(self):
+        next_poll = 0.0
+        while not self.stop_event.is_set():
+            if self.transport is None:
+                try:
+                    self._connect()
+                except Exception as e:
+                    self.error = f"Gagal membuka {self.port}: {e}"
+                    self._fail_pending(ModbusException(f"Bus {self.name}: {self.error}"))
+                    for spindle in self.slaves:
+                        self._report(spindle, connected=False, rpm_actual=None, error=self.error)
+                    self.stop_event.wait(self.reconnect_delay)
+                    continue
+
+            # Perintah didahulukan; polling jalan saat antrean kosong dan jadwalnya tiba
+            try:
+                spindle, fn, fut, deadline = self.commands.get(timeout=max(0.0, next_poll - time.monotonic()))
+            except queue.Empty:
+                fut = None
+            if fut is not None:
+                if fut.set_running_or_notify_cancel():
+                    if deadline is not None and time.monotonic() > deadline:
+                        # Pemanggil sudah menyerah; perintah basi tidak boleh sampai ke drive
+                        fut.set_exception(ModbusException(f"Bus {self.name}: perintah kedaluwarsa, tidak dikirim"))
+                        continue
+                    try:
+                        fut.set_result(self._io(fn, self.drives[spindle]))
+                    except Exception as e:
+                        fut.set_exception(e)
+                continue
+
+            next_poll = time.monotonic() + self.interval
+            for spindle, drive in list(self.drives.items()):
+                if self.transport is None:
+                    break
+                try:
+                    speed = self._io(drive.read_speed)
+                    self._report(spindle, connected=True, rpm_actual=speed, rpm_set=drive.rpm, error=None)
+                except Exception as e:
+                    self._report(spindle, connected=False, rpm_actual=None, error=str(e))
+
+    def _report(self, spindle, **fields):
+        if self.on_status is not None:
+            self.on_status(spindle, **fields)
+
+    def shutdown(self):
+        """Stop semua spindle di bus ini lalu tutup port."""
+        futures = [self.submit(spindle, lambda drive: drive.stop()) for spindle in self.slaves]
+        for fut in futures:
+            try:
+                fut.result(timeout=self.interval + 1.0)
+            except Exception:
+                pass
+        self.stop_event.set()
+        self.thread.join(timeout=self.interval + 1.5)
+        self._disconnect()
+
+    def snapshot(self):
+        busy = self.busy_since
+        status = {
+            "port": self.port,
+            "connected": self.connected,
+            "error": self.error,
+            "queued": self.commands.qsize(),
+            "busy": round(time.monotonic() - busy, 3) if busy is not None else 0.0,
+            "transactions": self.transactions,
+        }
+        transport = self.transport
+        if transport is not None and transport.meter is not None:
+            status["bus"] = transport.meter.snapshot()
+        return status
+
+
+class MultiBusController:
+    """
+    API perintah bersama dan telemetri gabungan di atas beberapa BusWorker.
+
+    Antarmukanya sama dengan SpindleService (execute / get_status / watcher),
+    jadi CommandHandler dan DaemonServer dari modbus_daemon.py dipakai ulang.
+    """
+
+    def __init__(self, buses, interval=1.0, command_timeout=2.0, journal=None, **options):
+        self.command_timeout = command_timeout
+        self.status = {}
+        self.status_lock = threading.Lock()
+        self.watchers = []
+        self.workers = {}
+        self.spindles = {}
+        for name, (port, slaves) in buses.items():
+            worker = BusWorker(name, port, slaves, interval=interval, on_status=self.update_status,
+                               journal=journal, **options)
+            self.workers[name] = worker
+            for spindle, slave in slaves.items():
+                self.spindles[spindle] = worker
+                self.status[spindle] = {"bus": name, "slave": slave, "connected": False, "rpm_set": 0,
+                                        "rpm_actual": None, "error": None, "time": None}
+
+    def start(self):
+        for worker in self.workers.values():
+            worker.start()
+
+    def shutdown(self):
+        # Semua bus dihentikan paralel; satu bus macet tidak menunda yang lain
+        threads = [threading.Thread(target=w.shutdown, daemon=True) for w in self.workers.values()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def update_status(self, spindle, **fields):
+        with self.status_lock:
+            status = self.status[spindle]
+            status.update(fields)
+            status["time"] = time.time()
+            snapshot = {"spindle": spindle, **status}
+            watchers = list(self.watchers)
+        for q in watchers:
+            try:
+                q.put_nowait(snapshot)
+            except queue.Full:
+                pass  # Klien lambat, lewati sampel ini
+
+    def get_status(self):
+        with self.status_lock:
+            spindles = {name: dict(status) for name, status in self.status.items()}
+        buses = {name: worker.snapshot() for name, worker in self.workers.items()}
+        return {"spindles": spindles, "buses": buses}
+
+    def add_watcher(self):
+        q = queue.Queue(maxsize=100)
+        with self.status_lock:
+            self.watchers.append(q)
+        return q
+
+    def remove_watcher(self, q):
+        with self.status_lock:
+            if q in self.watchers:
+                self.watchers.remove(q)
+
+    def execute(self, line):
+        """`<spindle|all> <perintah> [arg]` atau `status`; perintah ke beberapa bus berjalan paralel."""
+        parts = line.split()
+        if not parts:
+            raise ValueError("Perintah kosong.")
+        if parts[0].lower() == "status":
+            return self.get_status()
+        if len(parts) < 2:
+            raise ValueError("Format: <spindle|all> <perintah> [arg]")
+
+        target, cmd, args = parts[0], parts[1].lower(), parts[2:]
+        if target == "all":
+            targets = list(self.spindles)
+        elif target in self.spindles:
+            targets = [target]
+        else:
+            raise ValueError(f"Spindle tidak dikenal: {target}")
+
+        def run(drive):
+            apply_command(drive, cmd, args)
+            return drive.rpm
+
+        deadline = time.monotonic() + self.command_timeout
+        futures = {spindle: self.spindles[spindle].submit(spindle, run, deadline) for spindle in targets}
+        errors = {}
+        for spindle, fut in futures.items():
+            try:
+                rpm = fut.result(timeout=max(0.0, deadline - time.monotonic()))
+                self.update_status(spindle, rpm_set=rpm)
+            except FutureTimeout:
+                bus = self.spindles[spindle].name
+                if fut.cancel():
+                    errors[spindle] = f"Bus {bus} sibuk, perintah tidak dikirim dalam {self.command_timeout} s"
+                else:
+                    # Sudah dikirim ke drive; hasilnya belum diketahui
+                    errors[spindle] = (f"Bus {bus}: perintah sedang berjalan, status tidak diketahui "
+                                       f"(cek 'status')")
+                    self.update_status(spindle, error="perintah pending, status tidak diketahui")
+            except Exception as e:
+                errors[spindle] = str(e)
+        if errors:
+            raise ModbusException("; ".join(f"{spindle}: {error}" for spindle, error in errors.items()))
+        return self.get_status()
+
+
+def parse_spindle(spec):
+    """'nama=PORT@slave' -> (nama, port, slave); slave default SLAVE_ID."""
+    name, sep, target = spec.partition("=")
+    if not sep or not name:
+        raise argparse.ArgumentTypeError(f"Format spindle: nama=PORT[@slave], bukan {spec!r}")
+    port, at, slave = target.rpartition("@")
+    if not at:
+        port, slave = target, modbus_core.SLAVE_ID
+    return name, port, int(slave)
+
+
+def group_buses(spindles):
+    """List (nama, port, slave) -> {nama bus: (port, {spindle: slave})}; satu bus per port."""
+    buses = {}
+    names = {}
+    for name, port, slave in spindles:
+        bus = names.setdefault(port, f"bus{len(names)}")
+        buses.setdefault(bus, (port, {}))[1][name] = slave
+    return buses
+
+
+def serve(args):
+    journal = Journal(args.journal) if args.journal else None
+    controller = MultiBusController(
+        group_buses(args.spindle),
+        interval=args.interval,
+        command_timeout=args.command_timeout,
+        journal=journal,
+        baudrate=args.baud,
+        parity=args.parity,
+        stopbits=args.stopbits,
+    )
+    server = DaemonServer(args.socket, controller)
+    controller.start()
+    stop_on_sigterm(server)
+    for name, worker in controller.workers.items():
+        print(f"{name}: {worker.port} -> {', '.join(worker.slaves)}")
+    print(f"Controller siap: {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        controller.shutdown()
+        if journal is not None:
+            journal.close()
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Controller beberapa bus Modbus spindle dalam satu proses.")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Path Unix socket")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    p_serve = sub.add_parser("serve", help="Jalankan controller")
+    p_serve.add_argument("--spindle", action="append", type=parse_spindle, required=True,
+                         help="nama=PORT[@slave], boleh berulang; spindle dengan PORT sama berbagi satu bus")
+    p_serve.add_argument("--baud", type=int, default=38400)
+    p_serve.add_argument("--parity", default="Even", choices=["None", "Even", "Odd"])
+    p_serve.add_argument("--stopbits", type=int, default=1, choices=[1, 2])
+    p_serve.add_argument("--interval", type=float, default=1.0, help="Periode polling kecepatan per bus (detik)")
+    p_serve.add_argument("--command-timeout", type=float, default=2.0,
+                         help="Batas tunggu perintah sebelum bus dianggap macet (detik)")
+    p_serve.add_argument("--journal", help="Catat semua frame semua bus ke file journal biner")
+
+    p_ctl = sub.add_parser("ctl", help="Kirim perintah ke controller yang sedang jalan")
+    p_ctl.add_argument("command", nargs="+", help="mis. status, x rpm 1200, all stop, watch")
+
+    args = parser.parse_args(argv)
+    if args.mode == "serve":
+        serve(args)
+        return 0
+    return ctl(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""
+Upload/download parameter drive secara massal, simpan snapshot, dan diff dengan profil golden.
+
+Parameter mige P-xxx ada di holding register dengan alamat = nomor parameter
+(P-098 force enable = 0x0062, P-137 RPM = 0x0089). Baca memakai blok FC03
+sebesar mungkin (maks. 125 register per request); tulis hanya parameter
+yang berbeda memakai batch FC16, dengan fallback FC06 jika drive tidak
+mendukung FC16.
+
+Format snapshot / profil (JSON):
+
+    {"slave": 1, "time": "...", "params": {"P-004": 1, "P-025": 1}}
+
+Contoh:
+    python modbus_params.py read --port /dev/ttyUSB0 --out drive-sel1.json
+    python modbus_params.py diff drive-sel1.json param-mige-golden.json
+    python modbus_params.py write --port /dev/ttyUSB0 param-mige-golden.json --dry-run
+"""
+import argparse
+import json
+import sys
+import time
+
+import modbus_core
+from modbus_core import ModbusException, ModbusExceptionResponse
+
+MAX_READ = 125   # batas FC03 per request
+MAX_WRITE = 123  # batas FC16 per request
+# Blok yang ditolak dan sekecil ini tidak dibelah lagi, tapi dibaca per register
+PROBE_BLOCK = 16
+
+ILLEGAL_FUNCTION = 0x01
+ILLEGAL_DATA_ADDRESS = 0x02
+
+# Register perintah runtime; bukan bagian konfigurasi, tidak pernah ditulis ulang dari profil
+RUNTIME_REGISTERS = {
+    modbus_core.FORCE_ENABLE_ADDR,
+    0x0079, 0x007A, 0x007B,
+    modbus_core.RPM_CONTROL_ADDR,
+}
+
+
+def param_name(address):
+    return f"P-{address:03d}"
+
+
+def param_address(name):
+    return int(name.split("-", 1)[1]) if name.upper().startswith("P-") else int(name, 0)
+
+
+class ParameterManager:
+    """Operasi parameter untuk satu slave di atas satu port / transport."""
+
+    def __init__(self, port, slave_id=modbus_core.SLAVE_ID):
+        self.port = modbus_core.as_transport(port)
+        self.slave_id = slave_id
+        self.requests = 0
+
+    def _request(self, function_code, address, **kwargs):
+        self.requests += 1
+        return modbus_core.send_modbus_request(self.port, self.slave_id, function_code, address, **kwargs)
+
+    def read_block(self, address, count):
+        data = self._request(0x03, address, count=count)
+        if len(data) != 1 + 2 * count or data[0] != 2 * count:
+            raise ModbusException("Panjang respons baca parameter tidak valid.")
+        return [int.from_bytes(data[1 + 2 * i:3 + 2 * i], 'big') for i in range(count)]
+
+    def read_range(self, start, count):
+        """
+        Membaca rentang register dengan blok maksimal. Blok yang ditolak
+        (illegal address) dibelah dua, dan setelah sekecil PROBE_BLOCK dibaca
+        per register, sehingga celah di peta parameter tidak menggagalkan
+        seluruh baca dan peta yang jarang tidak memakan ~2 request per alamat.
+        """
+        params = {}
+        pending = [(a, min(MAX_READ, start + count - a)) for a in range(start, start + count, MAX_READ)]
+        while pending:
+            address, n = pending.pop(0)
+            try:
+                values = self.read_block(address, n)
+            except ModbusExceptionResponse as e:
+                if e.code != ILLEGAL_DATA_ADDRESS:
+                    raise
+                if n > PROBE_BLOCK:
+                    half = n // 2
+                    pending[:0] = [(address, half), (address + half, n - half)]
+                elif n > 1:
+                    pending[:0] = [(a, 1) for a in range(address, address + n)]
+                continue
+            for offset, value in enumerate(values):
+                params[address + offset] = value
+        return params
+
+    def write_params(self, changes, max_gap=0, known=None, protected=RUNTIME_REGISTERS):
+        """
+        Menulis {alamat: nilai} dengan batch FC16 register berurutan.
+
+        Jika `max_gap` > 0 dan nilai register di celah diketahui (`known`),
+        celah kecil ikut ditulis dengan nilai lamanya agar jumlah request turun.
+        Celah yang berisi register `protected` (perintah runtime) tidak pernah
+        dijembatani: nilai lama hasil baca bisa sudah basi dan menimpa
+        run/arah spindle, jadi batch dipecah di situ.
+        """
+        batches = []
+        for address in sorted(changes):
+            if batches:
+                last_start, last_values = batches[-1]
+                last_end = last_start + len(last_values)
+                gap = address - last_end
+                fits = len(last_values) + gap + 1 <= MAX_WRITE
+                bridge = range(last_end, address)
+                if fits and (gap == 0 or (0 < gap <= max_gap and known
+                                          and all(a in known and a not in protected for a in bridge))):
+                    last_values.extend(known[a] for a in bridge)
+                    last_values.append(changes[address])
+                    continue
+            batches.append((address, [changes[address]]))
+
+        for address, values in batches:
+            try:
+                if len(values) == 1:
+                    self._request(0x06, address, value=values[0])
+                else:
+                    self._request(0x10, address, values=values)
+            except ModbusExceptionResponse as e:
+                if e.code != ILLEGAL_FUNCTION:
+                    raise
+                # Drive tanpa FC16: tulis satu per satu
+                for offset, value in enumerate(values):
+                    self._request(0x06, address + offset, value=value)
+        return batches
+
+
+def diff_params(current, golden):
+    """List (alamat, nilai sekarang, nilai golden) untuk parameter yang berbeda."""
+    return [
+        (address, current.get(address), value)
+        for address, value in sorted(golden.items())
+        if current.get(address) != value
+    ]
+
+
+def load_snapshot(path):
+    with open(path, 'r') as f:
+        doc = json.load(f)
+    return {param_address(name): int(value) for name, value in doc["params"].items()}
+
+
+def save_snapshot(path, params, slave_id, port_name=None):
+    doc = {
+        "slave": slave_id,
+        "port": port_name,
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "params": {param_name(address): value for address, value in sorted(params.items())},
+    }
+    with open(path, 'w') as f:
+        json.dump(doc, f, indent=1)
+
+
+def _print_diff(differences):
+    if not differences:
+        print("Tidak ada perbedaan.")
+        return
+    print(f"{'parameter':10s} {'sekarang':>9s} {'golden':>9s}")
+    for address, current, golden in differences:
+        print(f"{param_name(address):10s} {'-' if current is None else current:>9} {golden:>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manajemen parameter drive (baca massal, diff, tulis batch).")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    p_read = sub.add_parser("read", help="Baca rentang parameter ke file snapshot")
+    p_read.add_argument("--out", required=True)
+    p_read.add_argument("--start", type=lambda x: int(x, 0), default=0)
+    p_read.add_argument("--count", type=lambda x: int(x, 0), default=200)
+
+    p_diff = sub.add_parser("diff", help="Bandingkan snapshot dengan profil golden")
+    p_diff.add_argument("snapshot")
+    p_diff.add_argument("golden")
+
+    p_write = sub.add_parser("write", help="Tulis parameter yang berbeda dari profil golden")
+    p_write.add_argument("golden")
+    p_write.add_argument("--dry-run", action="store_true", help="Hanya tampilkan perbedaan")
+    p_write.add_argument("--max-gap", type=int, default=4,
+                         help="Celah register yang boleh ikut ditulis ulang dalam satu batch")
+    p_write.add_argument("--include-runtime", action="store_true",
+                         help="Ikut tulis register perintah runtime (enable, forced input, RPM)")
+
+    for p in (p_read, p_write):
+        p.add_argument("--port", required=True, help="Port serial atau URL transport")
+        p.add_argument("--baud", type=int, default=38400)
+        p.add_argument("--parity", default="Even", choices=["None", "Even", "Odd"])
+        p.add_argument("--stopbits", type=int, default=1, choices=[1, 2])
+        p.add_argument("--slave", type=int, default=modbus_core.SLAVE_ID)
+
+    args = parser.parse_args(argv)
+
+    if args.mode == "diff":
+        _print_diff(diff_params(load_snapshot(args.snapshot), load_snapshot(args.golden)))
+        return 0
+
+    port = modbus_core.open_port(args.port, args.baud, args.parity, args.stopbits)
+    manager = ParameterManager(port, args.slave)
+    manager.port.verbose = False
+    started = time.perf_counter()
+    try:
+        if args.mode == "read":
+            params = manager.read_range(args.start, args.count)
+            save_snapshot(args.out, params, args.slave, args.port)
+            print(f"{len(params)} parameter dibaca dengan {manager.requests} request "
+                  f"dalam {time.perf_counter() - started:.2f} s -> {args.out}")
+            return 0
+
+        golden = load_snapshot(args.golden)
+        if not args.include_runtime:
+            golden = {a: v for a, v in golden.items() if a not in RUNTIME_REGISTERS}
+        if not golden:
+            print(f"Tidak ada parameter untuk ditulis di {args.golden} "
+                  "(register perintah runtime dilewati kecuali dengan --include-runtime).")
+            return 1
+        lo, hi = min(golden), max(golden)
+        current = manager.read_range(lo, hi - lo + 1)
+        differences = diff_params(current, golden)
+        _print_diff(differences)
+        if not differences or args.dry_run:
+            return 0
+
+        changes = {address: value for address, _, value in differences}
+        batches = manager.write_params(changes, args.max_gap, current)
+        verify = manager.read_range(lo, hi - lo + 1)
+        remaining = diff_params(verify, golden)
+        print(f"{len(changes)} parameter ditulis dalam {len(batches)} batch; "
+              f"total {manager.requests} request dalam {time.perf_counter() - started:.2f} s")
+        if remaining:
+            print("Verifikasi GAGAL, parameter masih berbeda:")
+            _print_diff(remaining)
+            return 1
+        print("Verifikasi OK.")
+        return 0
+    finally:
+        port.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
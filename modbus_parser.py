@@ -1,6 +1,13 @@
 
+import argparse
 import csv
-import sys
+from itertools import islice
+
+from modbus_core import calculate_crc
+from modbus_profile import PipelineProfiler, add_profile_arguments, profile_session
+
+# Jumlah baris CSV per blok pemrosesan
+CHUNK_ROWS = 65536
 
 def translate_modbus_command(command):
     """Menerjemahkan perintah Modbus ke dalam format yang mudah dibaca."""
@@ -31,61 +38,97 @@ def translate_modbus_command(command):
     else:
         return "Perintah tidak dikenal"
 
-def group_and_translate_modbus_data(csv_file_path):
+def crc_ok(hex_string):
+    """Cek CRC pesan hex (2 byte terakhir, little-endian seperti di kabel)."""
+    try:
+        data = bytes.fromhex(hex_string)
+    except ValueError:
+        return False
+    return len(data) >= 4 and calculate_crc(data[:-2]) == data[-2:]
+
+def print_commands(commands, profiler):
+    """Tahap cek CRC, terjemahan, dan output untuk sekumpulan perintah lengkap."""
+    if profiler.detail:
+        # Hanya untuk laporan --profile; output terjemahan tidak memakainya
+        with profiler.stage("crc", len(commands)):
+            bad = sum(1 for cmd in commands if not crc_ok(cmd))
+        profiler.count("perintah dengan CRC salah", bad)
+
+    with profiler.stage("decode", len(commands)):
+        lines = []
+        for cmd_with_crc in commands:
+            # Perintah Modbus biasanya memiliki 2 byte CRC di akhir
+            if len(cmd_with_crc) > 4:
+                cmd_without_crc = cmd_with_crc[:-4]
+                crc = cmd_with_crc[-4:]
+                translation = translate_modbus_command(cmd_without_crc)
+                lines.append(f"Perintah: {cmd_without_crc} (CRC: {crc}) -> {translation}")
+            else:
+                # Jika perintah terlalu pendek untuk memiliki CRC
+                translation = translate_modbus_command(cmd_with_crc)
+                lines.append(f"Perintah: {cmd_with_crc} -> {translation}")
+
+    with profiler.stage("output", len(lines)):
+        if lines:
+            print("\n".join(lines))
+
+def group_and_translate_modbus_data(csv_file_path, profiler=None):
     """
     Membaca file CSV berisi data Modbus, mengelompokkan data menjadi perintah,
     dan menerjemahkannya.
+
+    File diproses per blok CHUNK_ROWS baris; waktu setiap tahap dicatat ke
+    `profiler` (modbus_profile.PipelineProfiler).
     """
+    profiler = profiler or PipelineProfiler()
     try:
         with open(csv_file_path, 'r', newline='') as infile:
             # Menggunakan DictReader untuk kemudahan akses kolom
             reader = csv.DictReader(infile)
             
-            commands = []
             current_command_bytes = []
             last_time = 0.0
 
-            for row in reader:
-                try:
-                    # Menggunakan .get() untuk menghindari error jika kolom tidak ada
-                    start_time_str = row.get('start_time') or row.get('"start_time"')
-                    data_str = row.get('data') or row.get('"data"')
-
-                    if start_time_str is None or data_str is None:
-                        continue
-
-                    current_time = float(start_time_str)
-                    byte = data_str.replace('0x', '').upper().zfill(2)
-
-                    # Jika selisih waktu > 1 detik, anggap sebagai perintah baru
-                    if current_command_bytes and (current_time - last_time > 1.0):
-                        commands.append("".join(current_command_bytes))
-                        current_command_bytes = []
-
-                    current_command_bytes.append(byte)
-                    last_time = current_time
-                
-                except (ValueError, TypeError):
-                    # Lewati baris dengan data yang tidak valid
-                    continue
-            
+            print(f"Hasil Analisa dari file: {csv_file_path}\n")
+            while True:
+                with profiler.stage("csv"):
+                    rows = list(islice(reader, CHUNK_ROWS))
+                if not rows:
+                    break
+                profiler.add("csv", len(rows))
+
+                with profiler.stage("bytes", len(rows)):
+                    samples = []
+                    for row in rows:
+                        try:
+                            # Menggunakan .get() untuk menghindari error jika kolom tidak ada
+                            start_time_str = row.get('start_time') or row.get('"start_time"')
+                            data_str = row.get('data') or row.get('"data"')
+
+                            if start_time_str is None or data_str is None:
+                                continue
+
+                            samples.append((float(start_time_str), data_str.replace('0x', '').upper().zfill(2)))
+                        except (ValueError, TypeError):
+                            # Lewati baris dengan data yang tidak valid
+                            continue
+
+                with profiler.stage("framing", len(samples)):
+                    commands = []
+                    for current_time, byte in samples:
+                        # Jika selisih waktu > 1 detik, anggap sebagai perintah baru
+                        if current_command_bytes and (current_time - last_time > 1.0):
+                            commands.append("".join(current_command_bytes))
+                            current_command_bytes = []
+
+                        current_command_bytes.append(byte)
+                        last_time = current_time
+
+                print_commands(commands, profiler)
+
             # Tambahkan perintah terakhir yang tersisa
             if current_command_bytes:
-                commands.append("".join(current_command_bytes))
-
-            # Terjemahkan dan cetak setiap perintah
-            print(f"Hasil Analisa dari file: {csv_file_path}\n")
-            for cmd_with_crc in commands:
-                # Perintah Modbus biasanya memiliki 2 byte CRC di akhir
-                if len(cmd_with_crc) > 4:
-                    cmd_without_crc = cmd_with_crc[:-4]
-                    crc = cmd_with_crc[-4:]
-                    translation = translate_modbus_command(cmd_without_crc)
-                    print(f"Perintah: {cmd_without_crc} (CRC: {crc}) -> {translation}")
-                else:
-                    # Jika perintah terlalu pendek untuk memiliki CRC
-                    translation = translate_modbus_command(cmd_with_crc)
-                    print(f"Perintah: {cmd_with_crc} -> {translation}")
+                print_commands(["".join(current_command_bytes)], profiler)
 
     except FileNotFoundError:
         print(f"Error: File tidak ditemukan di {csv_file_path}")
@@ -93,10 +136,11 @@ def group_and_translate_modbus_data(csv_file_path):
         print(f"Terjadi error: {e}")
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        csv_path = sys.argv[1]
-    else:
-        # Gunakan path default jika tidak ada argumen yang diberikan
-        csv_path = "data-modbus-lincnc2.csv"
-    
-    group_and_translate_modbus_data(csv_path)
+    parser = argparse.ArgumentParser(description="Terjemahkan capture Modbus (format data-modbus-lincnc.csv).")
+    # Gunakan path default jika tidak ada argumen yang diberikan
+    parser.add_argument("csv_path", nargs="?", default="data-modbus-lincnc2.csv")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    with profile_session(args) as profiler:
+        group_and_translate_modbus_data(args.csv_path, profiler)
@@ -3,7 +3,15 @@ This script parses Modbus data from a CSV file where each row represents a byte.
 It groups bytes into messages based on timestamps and interprets the messages.
 '''
 
+import argparse
 import csv
+from itertools import islice
+
+from modbus_core import calculate_crc
+from modbus_profile import PipelineProfiler, add_profile_arguments, profile_session
+
+# Number of CSV rows per processing block
+CHUNK_ROWS = 65536
 
 def parse_modbus_messages(hex_string):
     """Parses a Modbus message and returns its interpretation."""
@@ -22,39 +30,83 @@ def parse_modbus_messages(hex_string):
     else:
         return "Perintah tidak dikenal"
 
-def group_and_parse_from_file(filename):
-    """Reads a CSV file, groups bytes into messages, and parses them."""
+def crc_ok(hex_string):
+    """Checks the CRC of a hex message (last 2 bytes, little-endian as on the wire)."""
+    try:
+        data = bytes.fromhex(hex_string)
+    except ValueError:
+        return False
+    return len(data) >= 4 and calculate_crc(data[:-2]) == data[-2:]
+
+def print_messages(messages, profiler):
+    """CRC check, interpretation and output stages for a batch of complete messages."""
+    if profiler.detail:
+        # Only for the --profile report; the translated output does not use it
+        with profiler.stage("crc", len(messages)):
+            bad = sum(1 for msg in messages if not crc_ok(msg))
+        profiler.count("pesan dengan CRC salah", bad)
+
+    with profiler.stage("decode", len(messages)):
+        lines = [f"Data: {msg}, Terjemahan: {parse_modbus_messages(msg)}" for msg in messages]
+
+    with profiler.stage("output", len(lines)):
+        if lines:
+            print("\n".join(lines))
+
+def group_and_parse_from_file(filename, profiler=None):
+    """
+    Reads a CSV file, groups bytes into messages, and parses them.
+
+    The file is processed in blocks of CHUNK_ROWS rows; each stage is timed
+    in `profiler` (modbus_profile.PipelineProfiler).
+    """
+    profiler = profiler or PipelineProfiler()
     with open(filename, 'r') as f:
         reader = csv.reader(f)
         header = next(reader)  # Skip header
 
-        messages = []
         current_message_bytes = []
         last_time = None
 
-        for row in reader:
-            try:
-                time_str, value_str = row[0], row[1]
-                current_time = float(time_str)
-                byte_val = value_str.strip().replace("0x", "")
+        while True:
+            with profiler.stage("csv"):
+                rows = list(islice(reader, CHUNK_ROWS))
+            if not rows:
+                break
+            profiler.add("csv", len(rows))
 
-                if last_time is not None and current_time - last_time > 0.1:  # Threshold to detect new message
-                    if current_message_bytes:
-                        messages.append("".join(current_message_bytes))
-                    current_message_bytes = []
+            with profiler.stage("bytes", len(rows)):
+                samples = []
+                for row in rows:
+                    try:
+                        time_str, value_str = row[0], row[1]
+                        samples.append((float(time_str), value_str.strip().replace("0x", "")))
+                    except (ValueError, IndexError):
+                        # Skip rows with formatting issues
+                        continue
 
-                current_message_bytes.append(byte_val)
-                last_time = current_time
-            except (ValueError, IndexError):
-                # Skip rows with formatting issues
-                continue
+            with profiler.stage("framing", len(samples)):
+                messages = []
+                for current_time, byte_val in samples:
+                    if last_time is not None and current_time - last_time > 0.1:  # Threshold to detect new message
+                        if current_message_bytes:
+                            messages.append("".join(current_message_bytes))
+                        current_message_bytes = []
 
-        if current_message_bytes:
-            messages.append("".join(current_message_bytes))
+                    current_message_bytes.append(byte_val)
+                    last_time = current_time
 
-        for msg in messages:
-            print(f"Data: {msg}, Terjemahan: {parse_modbus_messages(msg)}")
+            print_messages(messages, profiler)
+
+        if current_message_bytes:
+            print_messages(["".join(current_message_bytes)], profiler)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parse a per-byte Modbus capture (data.txt format).")
     # The new data file is 'data.txt', which is also in CSV format.
-    group_and_parse_from_file("data.txt")
+    parser.add_argument("filename", nargs="?", default="data.txt")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    with profile_session(args) as profiler:
+        group_and_parse_from_file(args.filename, profiler)
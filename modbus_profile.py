@@ -0,0 +1,180 @@
+"""
+Instrumentasi pipeline parser capture: waktu per tahap, throughput, memori puncak,
+dan sampler stack opsional untuk flame graph.
+
+Parser (modbus_parser.py, modbus_parser_new.py) memproses capture per blok
+baris; setiap tahap blok dibungkus `profiler.stage(...)`, sehingga biaya
+pengukuran hanya beberapa panggilan perf_counter per blok, bukan per byte.
+
+Tahap standar:
+    csv      membaca baris CSV
+    bytes    konversi teks waktu / nilai byte
+    framing  mengelompokkan byte menjadi frame
+    crc      cek CRC frame (hanya dengan --profile; tidak mengubah output)
+    decode   menerjemahkan frame
+    output   mencetak hasil
+
+Stack sampler menulis format "folded" (satu baris `a;b;c jumlah`) yang bisa
+langsung dipakai flamegraph.pl, speedscope, atau inferno:
+
+    python modbus_parser_new.py capture.txt --profile --profile-stacks parser.folded
+    flamegraph.pl parser.folded > parser.svg
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+STAGES = ("csv", "bytes", "framing", "crc", "decode", "output")
+
+STAGE_NAMES = {
+    "csv": "baca CSV",
+    "bytes": "konversi byte",
+    "framing": "framing",
+    "crc": "cek CRC",
+    "decode": "decode",
+    "output": "output",
+}
+
+
+def peak_memory():
+    """Resident set size puncak proses (byte), None jika tidak tersedia."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux melaporkan KB, macOS byte
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class PipelineProfiler:
+    """
+    Akumulator waktu dan jumlah item per tahap, plus counter bebas (mis. CRC salah).
+
+    `detail` False (default) berarti laporan tidak dicetak, jadi parser melewati
+    tahap yang hanya mengisi counter laporan (cek CRC).
+    """
+
+    def __init__(self, stages=STAGES, detail=False):
+        self.detail = detail
+        self.times = dict.fromkeys(stages, 0.0)
+        self.items = dict.fromkeys(stages, 0)
+        self.counters = Counter()
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name, items=0):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.times[name] = self.times.get(name, 0.0) + time.perf_counter() - start
+            self.items[name] = self.items.get(name, 0) + items
+
+    def add(self, name, items):
+        """Menambah jumlah item tahap yang baru diketahui setelah tahap selesai."""
+        self.items[name] = self.items.get(name, 0) + items
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def report(self, file=None):
+        file = file or sys.stderr
+        wall = time.perf_counter() - self.started
+        print(f"\n{'tahap':<14}{'waktu (s)':>10}{'%':>7}{'item':>12}{'item/s':>14}", file=file)
+        for name, elapsed in self.times.items():
+            items = self.items.get(name, 0)
+            rate = f"{items / elapsed:14,.0f}" if elapsed > 0 and items else f"{'-':>14}"
+            share = 100.0 * elapsed / wall if wall > 0 else 0.0
+            print(f"{STAGE_NAMES.get(name, name):<14}{elapsed:10.3f}{share:7.1f}{items:12,d}{rate}", file=file)
+        other = wall - sum(self.times.values())
+        print(f"{'lain-lain':<14}{other:10.3f}{100.0 * other / wall if wall > 0 else 0.0:7.1f}", file=file)
+        print(f"{'total':<14}{wall:10.3f}", file=file)
+        for name, value in sorted(self.counters.items()):
+            print(f"{name}: {value:,d}", file=file)
+        peak = peak_memory()
+        if peak is not None:
+            print(f"memori puncak: {peak / (1024 * 1024):.1f} MB", file=file)
+
+
+class StackSampler:
+    """
+    Sampler stack satu thread (default: thread pemanggil start()) tiap `interval` detik.
+
+    Hasilnya ditulis ke `path` dalam format folded saat stop().
+    """
+
+    def __init__(self, path, interval=0.005):
+        self.path = path
+        self.interval = interval
+        self.stacks = Counter()
+        self.stop_event = threading.Event()
+        self.target = None
+        self.thread = None
+
+    def start(self, target=None):
+        self.target = target if target is not None else threading.get_ident()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+        with open(self.path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return sum(self.stacks.values())
+
+
+def add_profile_arguments(parser):
+    """Opsi --profile / --profile-stacks yang sama untuk semua parser."""
+    parser.add_argument("--profile", action="store_true",
+                        help="Laporkan waktu per tahap, throughput, dan memori puncak (ke stderr)")
+    parser.add_argument("--profile-stacks", metavar="FILE",
+                        help="Tulis sampel stack format folded untuk flame graph")
+    parser.add_argument("--profile-interval", type=float, default=0.005,
+                        help="Interval sampling stack (detik)")
+    parser.add_argument("--expect-messages", type=int, metavar="N",
+                        help="Gagal (exit 1) jika jumlah pesan hasil framing bukan N (lihat modbus_capgen.py --preset)")
+
+
+@contextmanager
+def profile_session(args):
+    """Menyiapkan profiler dan sampler sesuai opsi CLI; laporan dicetak saat selesai."""
+    profiler = PipelineProfiler(detail=args.profile)
+    sampler = None
+    if args.profile_stacks:
+        sampler = StackSampler(args.profile_stacks, args.profile_interval)
+        sampler.start()
+    try:
+        yield profiler
+    finally:
+        if sampler is not None:
+            samples = sampler.stop()
+            print(f"{samples} sampel stack ditulis ke {args.profile_stacks}", file=sys.stderr)
+        if args.profile:
+            profiler.report()
+    # Setiap pesan lengkap melewati tahap decode tepat sekali
+    messages = profiler.items.get("decode", 0)
+    if args.expect_messages is not None and messages != args.expect_messages:
+        print(f"Jumlah pesan {messages}, diharapkan {args.expect_messages}", file=sys.stderr)
+        raise SystemExit(1)
@@ -0,0 +1,191 @@
+"""
+Replay capture: mengirim ulang trafik LinuxCNC -> VFD yang terekam dengan timing aslinya.
+
+Capture (data.txt, data-modbus-lincnc*.csv) diubah menjadi jadwal kirim,
+lalu setiap request dikirim ke port serial atau pseudo-terminal (mis. yang
+dibuat `modbus_server.py --pty`) pada kecepatan 1x, Nx, atau secepatnya.
+Respons live dibandingkan dengan respons rekaman jika ada.
+
+Contoh:
+    python modbus_replay.py data-modbus-lincnc.csv --port /dev/pts/3
+    python modbus_replay.py data.txt --port /dev/ttyUSB0 --speed 20
+    python modbus_replay.py data.txt --port /dev/pts/3 --speed 0     # secepatnya
+"""
+import argparse
+import statistics
+import sys
+import time
+from collections import namedtuple
+
+import modbus_capture
+import modbus_core
+from modbus_transport import rtu_response_length
+
+ScheduledFrame = namedtuple("ScheduledFrame", "offset request expected")
+
+
+def build_schedule(transactions, include_noise=False):
+    """
+    Transaksi capture -> list ScheduledFrame dengan offset relatif terhadap frame pertama.
+
+    Frame yang bukan Modbus (mis. satu byte 0xFF di awal data-modbus-lincnc2.csv)
+    dilewati kecuali `include_noise`. Frame dengan CRC salah tetap dikirim
+    apa adanya agar masalah di lapangan bisa direproduksi.
+    """
+    schedule = []
+    origin = None
+    for tx in transactions:
+        request = tx.request
+        if not include_noise and modbus_capture.decode_frame(request.data)["kind"] == "invalid":
+            continue
+        if origin is None:
+            origin = request.start
+        expected = tx.response.data if tx.response is not None else None
+        schedule.append(ScheduledFrame(request.start - origin, request.data, expected))
+    return schedule
+
+
+class ReplayReport:
+    """Ringkasan hasil replay."""
+
+    def __init__(self):
+        self.sent = 0
+        self.responses = 0
+        self.timeouts = 0
+        self.matched = 0
+        self.mismatched = []
+        self.latencies = []
+        self.max_slip = 0.0
+        self.duration = 0.0
+
+    def summary(self):
+        lines = [
+            f"Terkirim      : {self.sent} frame dalam {self.duration:.3f} s"
+            f" ({self.sent / self.duration if self.duration else 0:.0f} frame/s)",
+            f"Respons       : {self.responses} (timeout {self.timeouts})",
+            f"Cocok rekaman : {self.matched}, beda {len(self.mismatched)}",
+            f"Telat jadwal  : maks {self.max_slip * 1000:.2f} ms",
+        ]
+        if self.latencies:
+            ordered = sorted(self.latencies)
+            p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+            lines.append(
+                f"Latensi       : median {statistics.median(ordered) * 1000:.2f} ms,"
+                f" p99 {p99 * 1000:.2f} ms, maks {ordered[-1] * 1000:.2f} ms"
+            )
+        return "\n".join(lines)
+
+
+class ReplayEngine:
+    """
+    Mengirim jadwal ke satu port serial.
+
+    `speed` = 1 untuk timing asli, N untuk N kali lebih cepat, 0 untuk secepatnya
+    (frame berikut dikirim begitu respons sebelumnya diterima atau timeout).
+    """
+
+    def __init__(self, ser, speed=1.0):
+        # Timeout respons = timeout baca port, diatur sekali saat open_serial;
+        # mengubahnya per frame memicu konfigurasi ulang termios
+        self.ser = ser
+        self.speed = speed
+
+    def exchange(self, adu):
+        """Kirim satu ADU mentah dan baca respons berdasarkan panjang function code."""
+        ser = self.ser
+        ser.reset_input_buffer()
+        ser.write(adu)
+        header = ser.read(3)
+        if len(header) < 3:
+            return header or None
+        length = rtu_response_length(header)
+        if length is None:
+            # Function code tak dikenal: ambil apa pun yang sudah masuk
+            return header + ser.read(ser.in_waiting)
+        return header + ser.read(length - 3)
+
+    def run(self, schedule, on_mismatch=None):
+        report = ReplayReport()
+        start = time.perf_counter()
+        for item in schedule:
+            if self.speed > 0:
+                target = start + item.offset / self.speed
+                delay = target - time.perf_counter()
+                if delay > 0.002:
+                    time.sleep(delay - 0.001)
+                while time.perf_counter() < target:
+                    pass
+                report.max_slip = max(report.max_slip, time.perf_counter() - target)
+
+            sent_at = time.perf_counter()
+            response = self.exchange(item.request)
+            report.sent += 1
+            if not response:
+                report.timeouts += 1
+                # Request tanpa respons di rekaman juga dianggap cocok
+                if item.expected is None:
+                    report.matched += 1
+                else:
+                    report.mismatched.append((item, b""))
+                    if on_mismatch:
+                        on_mismatch(item, b"")
+                continue
+
+            report.responses += 1
+            report.latencies.append(time.perf_counter() - sent_at)
+            if item.expected is None or response == item.expected:
+                report.matched += 1
+            else:
+                report.mismatched.append((item, response))
+                if on_mismatch:
+                    on_mismatch(item, response)
+        report.duration = time.perf_counter() - start
+        return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay capture Modbus ke port serial / pty.")
+    parser.add_argument("capture", help="File capture (format data.txt atau data-modbus-lincnc.csv)")
+    parser.add_argument("--port", required=True, help="Port serial atau pseudo-terminal tujuan")
+    parser.add_argument("--speed", type=float, default=1.0, help="Pengali kecepatan; 0 = secepatnya")
+    parser.add_argument("--timeout", type=float, default=0.2, help="Timeout respons per frame (detik)")
+    parser.add_argument("--loop", type=int, default=1, help="Ulangi jadwal N kali")
+    parser.add_argument("--baud", type=int, default=38400)
+    parser.add_argument("--parity", default="Even", choices=["None", "Even", "Odd"])
+    parser.add_argument("--stopbits", type=int, default=1, choices=[1, 2])
+    parser.add_argument("--capture-baud", type=int, default=modbus_capture.DEFAULT_BAUDRATE,
+                        help="Baudrate saat capture direkam (untuk deteksi batas frame)")
+    parser.add_argument("--include-noise", action="store_true", help="Kirim juga frame yang bukan Modbus")
+    args = parser.parse_args(argv)
+
+    transactions = modbus_capture.load_transactions(args.capture, args.capture_baud)
+    schedule = build_schedule(transactions, args.include_noise)
+    if not schedule:
+        print("Capture tidak berisi frame Modbus.")
+        return 1
+
+    if args.loop > 1:
+        span = schedule[-1].offset + 0.1
+        schedule = [
+            ScheduledFrame(item.offset + i * span, item.request, item.expected)
+            for i in range(args.loop) for item in schedule
+        ]
+
+    ser = modbus_core.open_serial(args.port, args.baud, args.parity, args.stopbits, timeout=args.timeout)
+    engine = ReplayEngine(ser, speed=args.speed)
+
+    def on_mismatch(item, response):
+        print(f"BEDA @{item.offset:.6f}s req {item.request.hex().upper()}: "
+              f"rekaman {item.expected.hex().upper()} != live {response.hex().upper() or '(timeout)'}")
+
+    print(f"Replay {len(schedule)} frame dari {args.capture} ke {args.port} (speed {args.speed or 'maks'})")
+    try:
+        report = engine.run(schedule, on_mismatch)
+    finally:
+        ser.close()
+    print(report.summary())
+    return 1 if report.mismatched else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,448 @@
+"""
+Server/slave Modbus pengganti driver asli, untuk uji regresi dan capacity planning.
+
+Menyajikan peta register yang dipakai controller di repo ini:
+
+    mige    holding 0x0089 RPM, 0x0062 force enable, 0x0079/0x007A/0x007B forced input,
+            input 0x0000 kecepatan aktual, input 0x0001 kode fault
+    leo     holding 0x6000 control word, 0x5000 frekuensi
+    lincnc  holding 0x0002 control word, 0x0004 kecepatan, 0x0108 kecepatan aktual,
+            0x0109 kode fault
+            (peta classicladder di custom.clp, lihat data-modbus-lincnc.csv)
+
+Listener berbasis asyncio: Modbus TCP (MBAP), RTU-over-TCP, dan RTU di port
+serial / pseudo-terminal. Capture bisa diputar ulang sebagai respons skrip:
+request yang persis sama dengan request di capture dijawab dengan respons
+rekamannya; selain itu dijawab oleh simulator register.
+
+Contoh:
+    python modbus_server.py --tcp 127.0.0.1:5020 --rtu-tcp 127.0.0.1:5021 --profile mige
+    python modbus_server.py --pty --profile lincnc --replay data-modbus-lincnc.csv
+    python modbus_server.py --pty --profile mige --trip 10:4     # trip overload setelah 10 s
+"""
+import argparse
+import asyncio
+import collections
+import os
+import struct
+import sys
+import time
+from array import array
+
+from modbus_core import calculate_crc
+from modbus_faults import FAULT_PROFILES
+from modbus_transport import rtu_request_length
+import modbus_capture
+
+# Kode exception Modbus
+ILLEGAL_FUNCTION = 0x01
+ILLEGAL_DATA_ADDRESS = 0x02
+ILLEGAL_DATA_VALUE = 0x03
+
+_MBAP = struct.Struct('>HHHB')
+_ADDR_VALUE = struct.Struct('>HH')
+
+DRIVE_PROFILES = {
+    "mige": {
+        "holding": [0x0089, 0x0062, 0x0079, 0x007A, 0x007B],
+        "input": [0x0000, 0x0001],
+    },
+    "leo": {
+        "holding": [0x6000, 0x5000],
+        "input": [],
+    },
+    "lincnc": {
+        "holding": [0x0002, 0x0004, 0x0108, 0x0109],
+        "input": [],
+    },
+}
+
+
+class DriveSimulator:
+    """
+    Bank register satu slave beserta perilaku sederhana drive-nya.
+
+    Register disimpan di array 64K word, sehingga baca blok cukup satu slice.
+    Alamat di luar peta profil dijawab exception ILLEGAL_DATA_ADDRESS,
+    kecuali `strict=False`.
+    """
+
+    def __init__(self, profile="mige", strict=True):
+        self.profile = profile
+        self.strict = strict
+        self.holding = array('H', bytes(2 * 0x10000))
+        self.input = array('H', bytes(2 * 0x10000))
+        self.valid_holding = set(DRIVE_PROFILES[profile]["holding"])
+        self.valid_input = set(DRIVE_PROFILES[profile]["input"])
+
+    def _check(self, valid, address, count):
+        if not self.strict:
+            return address + count <= 0x10000
+        return all(a in valid for a in range(address, address + count))
+
+    def read(self, function_code, address, count):
+        bank, valid = (self.holding, self.valid_holding) if function_code == 0x03 else (self.input, self.valid_input)
+        if not 1 <= count <= 125:
+            return None, ILLEGAL_DATA_VALUE
+        if not self._check(valid, address, count):
+            return None, ILLEGAL_DATA_ADDRESS
+        words = bank[address:address + count]
+        if sys.byteorder == 'little':
+            words.byteswap()
+        return words.tobytes(), 0
+
+    def write(self, address, values):
+        if not self._check(self.valid_holding, address, len(values)):
+            return ILLEGAL_DATA_ADDRESS
+        self.holding[address:address + len(values)] = array('H', values)
+        for offset in range(len(values)):
+            self.on_write(address + offset)
+        return 0
+
+    def on_write(self, address):
+        """Efek samping write, meniru perilaku drive."""
+        h = self.holding
+        if self.profile == "mige":
+            # Kecepatan aktual = RPM perintah selama force enable aktif dan tidak trip
+            self.input[0x0000] = h[0x0089] if h[0x0062] and not self.input[0x0001] else 0
+        elif self.profile == "lincnc":
+            # Control word: 1 = kanan, 2 = kiri, 4 = stop
+            h[0x0108] = h[0x0004] if h[0x0002] in (1, 2) and not h[0x0109] else 0
+
+    def trip(self, code):
+        """Meniru trip drive: kode fault diisi dan motor berhenti (kode 0 = reset)."""
+        fault = FAULT_PROFILES.get(self.profile)
+        if fault is None:
+            return
+        bank = self.holding if fault["function"] == 0x03 else self.input
+        bank[fault["address"]] = code
+        if code:
+            if self.profile == "mige":
+                self.input[0x0000] = 0
+            elif self.profile == "lincnc":
+                self.holding[0x0108] = 0
+
+    def handle_pdu(self, pdu):
+        """Memproses PDU request dan mengembalikan PDU respons."""
+        function_code = pdu[0]
+        try:
+            if function_code in (0x03, 0x04):
+                address, count = _ADDR_VALUE.unpack_from(pdu, 1)
+                data, error = self.read(function_code, address, count)
+                if not error:
+                    return bytes((function_code, len(data))) + data
+            elif function_code == 0x06:
+                address, value = _ADDR_VALUE.unpack_from(pdu, 1)
+                error = self.write(address, [value])
+                if not error:
+                    return pdu[:5]
+            elif function_code == 0x10:
+                address, count = _ADDR_VALUE.unpack_from(pdu, 1)
+                # PDU terpotong (tanpa byte count) juga ILLEGAL_DATA_VALUE, bukan IndexError
+                if len(pdu) < 6 or not 1 <= count <= 123 or pdu[5] != 2 * count:
+                    error = ILLEGAL_DATA_VALUE
+                else:
+                    error = self.write(address, struct.unpack_from(f'>{count}H', pdu, 6))
+                if not error:
+                    return pdu[:5]
+            else:
+                error = ILLEGAL_FUNCTION
+        except struct.error:
+            error = ILLEGAL_DATA_VALUE
+        return bytes((function_code | 0x80, error))
+
+
+class ReplayScript:
+    """
+    Respons skrip dari capture: ADU request -> antrean ADU respons rekaman.
+
+    Jika satu request muncul beberapa kali, responsnya diputar bergiliran.
+    Capture yang hanya berisi request (seperti capture di repo ini) tidak
+    menghasilkan skrip; request tersebut dijawab oleh simulator.
+    """
+
+    def __init__(self):
+        self.responses = {}
+
+    @classmethod
+    def from_capture(cls, path, baudrate=modbus_capture.DEFAULT_BAUDRATE):
+        script = cls()
+        for tx in modbus_capture.load_transactions(path, baudrate):
+            if tx.response is not None and modbus_capture.crc_ok(tx.request.data):
+                script.add(tx.request.data, tx.response.data)
+        return script
+
+    def add(self, request_adu, response_adu):
+        self.responses.setdefault(bytes(request_adu), collections.deque()).append(bytes(response_adu))
+
+    def lookup(self, request_adu):
+        queue = self.responses.get(bytes(request_adu))
+        if not queue:
+            return None
+        response = queue[0]
+        queue.rotate(-1)
+        return response
+
+    def __len__(self):
+        return len(self.responses)
+
+
+class ModbusServer:
+    """Kumpulan slave + skrip replay; inti yang dipakai semua listener."""
+
+    def __init__(self, slaves, script=None, delay=0.0):
+        self.slaves = slaves
+        self.script = script
+        self.delay = delay
+        self.requests = 0
+
+    def handle_pdu(self, slave_id, pdu):
+        """PDU request -> PDU respons, atau None jika slave tidak ada (diam, seperti RS-485)."""
+        self.requests += 1
+        slave = self.slaves.get(slave_id)
+        if slave is None:
+            return None
+        return slave.handle_pdu(pdu)
+
+    def handle_rtu(self, adu):
+        """ADU RTU request -> ADU RTU respons, atau None jika tidak dijawab."""
+        if self.script is not None:
+            scripted = self.script.lookup(adu)
+            if scripted is not None:
+                self.requests += 1
+                return scripted
+        if calculate_crc(adu[:-2]) != adu[-2:]:
+            self.requests += 1
+            return None  # CRC salah: slave RTU asli diam saja
+        response = self.handle_pdu(adu[0], adu[1:-2])
+        if response is None:
+            return None
+        response = bytes((adu[0],)) + response
+        return response + calculate_crc(response)
+
+    def handle_mbap(self, header, pdu):
+        tid, _, _, unit = _MBAP.unpack(header)
+        if self.script is not None:
+            # Skrip disimpan sebagai ADU RTU, jadi request dicocokkan dalam bentuk RTU
+            rtu = bytes((unit,)) + pdu
+            scripted = self.script.lookup(rtu + calculate_crc(rtu))
+            if scripted is not None:
+                self.requests += 1
+                response = scripted[1:-2]
+                return _MBAP.pack(tid, 0, len(response) + 1, unit) + response
+        response = self.handle_pdu(unit, pdu)
+        if response is None:
+            # Gateway TCP menjawab exception 0x0B (target device failed to respond)
+            response = bytes((pdu[0] | 0x80, 0x0B))
+        return _MBAP.pack(tid, 0, len(response) + 1, unit) + response
+
+
+class _ServerProtocol(asyncio.Protocol):
+    """Basis protokol: buffer masuk dipotong menjadi frame lalu dijawab."""
+
+    def __init__(self, server):
+        self.server = server
+        self.buffer = bytearray()
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        self.buffer += data
+        while True:
+            frame = self.next_frame()
+            if frame is None:
+                break
+            response = self.respond(frame)
+            if response:
+                self.send(response)
+
+    def send(self, response):
+        if self.server.delay:
+            asyncio.get_running_loop().call_later(self.server.delay, self.transport.write, response)
+        else:
+            self.transport.write(response)
+
+
+class MbapProtocol(_ServerProtocol):
+    """Modbus TCP: request berurutan dalam satu koneksi boleh dikirim tanpa menunggu (pipelined)."""
+
+    def next_frame(self):
+        if len(self.buffer) < 7:
+            return None
+        length = int.from_bytes(self.buffer[4:6], 'big')
+        if length < 2:
+            # Header MBAP rusak (minimal unit id + function code); tanpa batas frame
+            # yang bisa dipercaya koneksi ditutup, bukan dilempar exception
+            self.buffer.clear()
+            self.transport.close()
+            return None
+        end = 6 + length
+        if len(self.buffer) < end:
+            return None
+        frame = bytes(self.buffer[:end])
+        del self.buffer[:end]
+        return frame
+
+    def respond(self, frame):
+        return self.server.handle_mbap(frame[:7], frame[7:])
+
+
+class RtuProtocol(_ServerProtocol):
+    """
+    RTU-over-TCP: panjang frame ditentukan dari function code.
+
+    Byte sampah (function code tidak dikenal atau CRC salah) dibuang satu per
+    satu sampai ditemukan frame dengan CRC valid, sehingga frame valid yang
+    antre di belakangnya tetap dijawab.
+    """
+
+    def next_frame(self):
+        while True:
+            if len(self.buffer) < 2:
+                return None
+            length = rtu_request_length(self.buffer[:7])
+            if length is None:
+                if len(self.buffer) < 7 and self.buffer[1] in (0x0F, 0x10):
+                    return None
+                del self.buffer[:1]
+                continue
+            if len(self.buffer) < length:
+                return None
+            frame = bytes(self.buffer[:length])
+            if calculate_crc(frame[:-2]) != frame[-2:]:
+                # Slave RTU asli diam untuk frame rusak; geser satu byte lalu coba sinkron lagi
+                del self.buffer[:1]
+                continue
+            del self.buffer[:length]
+            return frame
+
+    def respond(self, frame):
+        return self.server.handle_rtu(frame)
+
+
+class _FdTransport:
+    """Pembungkus minimal agar RtuProtocol bisa menulis ke file descriptor serial/pty."""
+
+    def __init__(self, fd):
+        self.fd = fd
+
+    def write(self, data):
+        os.write(self.fd, data)
+
+
+def attach_fd(loop, server, fd):
+    """Melayani RTU pada file descriptor (port serial atau master pty)."""
+    protocol = RtuProtocol(server)
+    protocol.connection_made(_FdTransport(fd))
+
+    def readable():
+        try:
+            data = os.read(fd, 4096)
+        except OSError:
+            return
+        if data:
+            protocol.data_received(data)
+
+    loop.add_reader(fd, readable)
+    return protocol
+
+
+def open_pty():
+    """Membuat pasangan pseudo-terminal mentah; mengembalikan (fd master, path slave)."""
+    import pty
+    import tty
+
+    master, slave = pty.openpty()
+    tty.setraw(master)
+    tty.setraw(slave)
+    return master, os.ttyname(slave)
+
+
+def _split_hostport(text, default_host="127.0.0.1"):
+    host, _, port = text.rpartition(":")
+    return host or default_host, int(port)
+
+
+async def _report(server, interval):
+    last, last_time = server.requests, time.monotonic()
+    while True:
+        await asyncio.sleep(interval)
+        now = time.monotonic()
+        rate = (server.requests - last) / (now - last_time)
+        print(f"{server.requests} request, {rate:.0f} req/s")
+        last, last_time = server.requests, now
+
+
+async def run(args):
+    loop = asyncio.get_running_loop()
+    slaves = {slave_id: DriveSimulator(args.profile, strict=not args.loose) for slave_id in args.slave}
+    script = ReplayScript.from_capture(args.replay, args.baud) if args.replay else None
+    server = ModbusServer(slaves, script, delay=args.delay / 1000.0)
+    if script is not None:
+        print(f"Skrip replay: {len(script)} request unik dari {args.replay}")
+
+    listeners = []
+    for spec in args.tcp:
+        host, port = _split_hostport(spec)
+        listeners.append(await loop.create_server(lambda: MbapProtocol(server), host, port))
+        print(f"Modbus TCP di {host}:{port}")
+    for spec in args.rtu_tcp:
+        host, port = _split_hostport(spec)
+        listeners.append(await loop.create_server(lambda: RtuProtocol(server), host, port))
+        print(f"RTU-over-TCP di {host}:{port}")
+    for path in args.serial:
+        import modbus_core
+        ser = modbus_core.open_serial(path, args.baud, args.parity, args.stopbits, timeout=0)
+        attach_fd(loop, server, ser.fileno())
+        listeners.append(ser)
+        print(f"RTU serial di {path}")
+    if args.pty:
+        master, path = open_pty()
+        attach_fd(loop, server, master)
+        print(f"RTU pseudo-terminal di {path}", flush=True)
+
+    if not listeners and not args.pty:
+        raise SystemExit("Tidak ada listener; pakai --tcp, --rtu-tcp, --serial atau --pty.")
+
+    for spec in args.trip:
+        delay, _, code = spec.partition(":")
+        for slave in slaves.values():
+            loop.call_later(float(delay), slave.trip, int(code or 1))
+
+    if args.stats:
+        await _report(server, args.stats)
+    else:
+        await asyncio.Event().wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Server Modbus pengganti driver VFD.")
+    parser.add_argument("--tcp", action="append", default=[], metavar="HOST:PORT", help="Listener Modbus TCP")
+    parser.add_argument("--rtu-tcp", action="append", default=[], metavar="HOST:PORT", help="Listener RTU-over-TCP")
+    parser.add_argument("--serial", action="append", default=[], metavar="PORT", help="Port serial RTU")
+    parser.add_argument("--pty", action="store_true", help="Buat pseudo-terminal RTU dan cetak path-nya")
+    parser.add_argument("--profile", default="mige", choices=sorted(DRIVE_PROFILES))
+    parser.add_argument("--slave", type=int, action="append", help="Slave id yang dilayani (boleh berulang)")
+    parser.add_argument("--loose", action="store_true", help="Terima semua alamat register")
+    parser.add_argument("--replay", help="File capture untuk respons skrip")
+    parser.add_argument("--delay", type=float, default=0.0, help="Jeda respons (ms)")
+    parser.add_argument("--baud", type=int, default=38400)
+    parser.add_argument("--parity", default="Even", choices=["None", "Even", "Odd"])
+    parser.add_argument("--stopbits", type=int, default=1, choices=[1, 2])
+    parser.add_argument("--stats", type=float, default=0, metavar="DETIK", help="Cetak laju request berkala")
+    parser.add_argument("--trip", action="append", default=[], metavar="DETIK:KODE",
+                        help="Trip semua slave dengan kode fault setelah N detik (KODE 0 = reset)")
+    args = parser.parse_args(argv)
+    args.slave = args.slave or [1]
+
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,358 @@
+"""
+Model timing dan utilisasi bus RS-485 Modbus RTU untuk perencanaan kapasitas polling.
+
+Menghitung air-time frame yang tepat (start, data, parity, stop bit, jeda
+3.5 karakter), waktu satu transaksi termasuk jeda master (mis.
+MODBUS_MASTER_TIME_AFTER_TRANSMIT / TIME_INTER_FRAME di custom.clp), lalu
+memprediksi laju maksimum dan jumlah drive yang muat di satu jalur.
+Prediksi bisa dibandingkan dengan utilisasi terukur dari capture atau dari
+client live (UtilisationMeter yang dipasang di transport).
+
+Contoh:
+    python modbus_timing.py clp custom.clp
+    python modbus_timing.py capture data-modbus-lincnc.csv --parity None
+    python modbus_timing.py capacity --baud 38400 --poll 3:0x0108:1@10 --poll 6:0x0004@2
+"""
+import argparse
+import sys
+import threading
+import time
+from collections import namedtuple
+
+DATA_BITS = 8
+
+# Jenis request ClassicLadder (kolom ke-2 _FILE-modbusioconf.csv) -> function code
+CLASSICLADDER_REQUESTS = {
+    0: 0x02,  # read inputs
+    1: 0x0F,  # write coils
+    2: 0x04,  # read input registers
+    3: 0x06,  # write holding registers (0x10 jika lebih dari satu)
+    4: 0x01,  # read coils
+    5: 0x03,  # read holding registers
+}
+
+Poll = namedtuple("Poll", "slave function address count rate")
+Poll.__new__.__defaults__ = (1, None)
+
+
+class LineConfig:
+    """Parameter karakter satu jalur serial."""
+
+    def __init__(self, baudrate=38400, parity="Even", stopbits=1, databits=DATA_BITS):
+        self.baudrate = int(baudrate)
+        self.parity = parity
+        self.stopbits = float(stopbits)
+        self.databits = databits
+
+    @property
+    def bits_per_char(self):
+        return 1 + self.databits + (0 if self.parity in ("None", "N", 0, "0") else 1) + self.stopbits
+
+    @property
+    def char_time(self):
+        return self.bits_per_char / self.baudrate
+
+    @property
+    def t15(self):
+        # Spesifikasi Modbus: di atas 19200 baud nilai t1.5/t3.5 ditetapkan
+        return 0.00075 if self.baudrate > 19200 else 1.5 * self.char_time
+
+    @property
+    def t35(self):
+        return 0.00175 if self.baudrate > 19200 else 3.5 * self.char_time
+
+    def air_time(self, nbytes):
+        """Waktu kirim `nbytes` byte tanpa jeda antar karakter."""
+        return nbytes * self.char_time
+
+    def frame_time(self, nbytes):
+        """Air-time frame ditambah silent interval 3.5 karakter sesudahnya."""
+        return self.air_time(nbytes) + self.t35
+
+    def __str__(self):
+        parity = {"None": "N", "Even": "E", "Odd": "O"}.get(self.parity, self.parity)
+        return f"{self.baudrate} {self.databits}{parity}{self.stopbits:g} ({self.bits_per_char:g} bit/karakter)"
+
+
+def frame_sizes(function_code, count=1):
+    """Panjang ADU (request, respons) dalam byte untuk satu function code."""
+    if function_code in (0x03, 0x04):
+        return 8, 5 + 2 * count
+    if function_code in (0x01, 0x02):
+        return 8, 5 + (count + 7) // 8
+    if function_code in (0x05, 0x06):
+        return 8, 8
+    if function_code == 0x10:
+        return 9 + 2 * count, 8
+    if function_code == 0x0F:
+        return 9 + (count + 7) // 8, 8
+    raise ValueError(f"Function code tidak didukung: {function_code}")
+
+
+class TimingModel:
+    """
+    Waktu yang dipakai satu transaksi di bus half-duplex.
+
+    turnaround      waktu proses slave sebelum mulai menjawab
+    after_transmit  jeda master setelah kirim sebelum mulai mendengar
+    inter_frame     jeda master sebelum request berikutnya
+    timeout         batas tunggu respons jika slave diam
+    """
+
+    def __init__(self, line, turnaround=0.002, after_transmit=0.0, inter_frame=0.0, timeout=1.0):
+        self.line = line
+        self.turnaround = turnaround
+        self.after_transmit = after_transmit
+        self.inter_frame = inter_frame
+        self.timeout = timeout
+
+    def wire_time(self, poll):
+        """Air-time murni request + respons (yang benar-benar ada di kabel)."""
+        req, resp = frame_sizes(poll.function, poll.count)
+        return self.line.air_time(req + resp)
+
+    def transaction_time(self, poll, responded=True):
+        """Waktu bus terpakai dari awal request sampai master boleh kirim lagi."""
+        req, resp = frame_sizes(poll.function, poll.count)
+        t = self.line.frame_time(req) + self.after_transmit
+        if responded:
+            t += max(self.turnaround - self.after_transmit, 0.0) + self.line.frame_time(resp)
+        else:
+            t += self.timeout
+        return t + self.inter_frame
+
+    def cycle_time(self, polls):
+        """Waktu satu putaran semua poll (round-robin, seperti ClassicLadder)."""
+        return sum(self.transaction_time(p) for p in polls)
+
+    def utilisation(self, polls):
+        """
+        (wire, occupancy) untuk poll dengan laju tetap.
+
+        wire = fraksi waktu ada bit di kabel; occupancy = fraksi waktu bus
+        dipesan oleh transaksi (termasuk jeda dan turnaround). Kapasitas
+        dibatasi occupancy, bukan wire.
+        """
+        wire = sum(p.rate * self.wire_time(p) for p in polls if p.rate)
+        occupancy = sum(p.rate * self.transaction_time(p) for p in polls if p.rate)
+        return wire, occupancy
+
+    def max_rate(self, poll):
+        """Laju maksimum satu poll jika memakai bus sendirian (Hz)."""
+        return 1.0 / self.transaction_time(poll)
+
+    def max_drives(self, polls_per_drive, headroom=0.7):
+        """
+        Jumlah drive identik yang muat di satu jalur, dengan batas
+        occupancy `headroom` untuk retry dan perintah tak terjadwal.
+        """
+        _, occupancy = self.utilisation(polls_per_drive)
+        if occupancy <= 0:
+            return None
+        return int(headroom / occupancy)
+
+
+class UtilisationMeter:
+    """
+    Pengukur utilisasi live. Pasang di transport (`transport.meter = meter`);
+    setiap transaksi mencatat jumlah byte dan lama bus dipakai.
+    """
+
+    def __init__(self, line):
+        self.line = line
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.monotonic()
+            self.transactions = 0
+            self.bytes = 0
+            self.busy = 0.0
+
+    def record(self, tx_bytes, rx_bytes, busy):
+        with self.lock:
+            self.transactions += 1
+            self.bytes += tx_bytes + rx_bytes
+            self.busy += busy
+
+    def snapshot(self):
+        with self.lock:
+            elapsed = max(time.monotonic() - self.started, 1e-9)
+            return {
+                "elapsed": elapsed,
+                "rate": self.transactions / elapsed,
+                "wire": self.line.air_time(self.bytes) / elapsed,
+                "occupancy": self.busy / elapsed,
+            }
+
+
+def parse_clp(path):
+    """
+    Membaca _FILE-com_params.txt dan _FILE-modbusioconf.csv dari file ClassicLadder.
+
+    Mengembalikan (TimingModel, list Poll). Laju poll = None karena
+    ClassicLadder memutar semua request round-robin secepat mungkin.
+    """
+    params = {}
+    polls = []
+    section = None
+    with open(path, 'r', errors='replace') as f:
+        for raw in f:
+            line = raw.strip()
+            if line.startswith("_FILE-"):
+                section = line[len("_FILE-"):]
+                continue
+            if line.startswith("_/FILE-"):
+                section = None
+                continue
+            if section == "com_params.txt" and "=" in line:
+                key, _, value = line.partition("=")
+                params[key] = value
+            elif section == "modbusioconf.csv" and line and not line.startswith("#"):
+                fields = [int(x) for x in line.split(",")]
+                slave, req_type, first, count = fields[:4]
+                function = CLASSICLADDER_REQUESTS.get(req_type)
+                if function == 0x06 and count > 1:
+                    function = 0x10
+                if function is not None:
+                    offset = int(params.get("MODBUS_ELEMENT_OFFSET", 0))
+                    polls.append(Poll(slave, function, first - offset, count))
+
+    parity = {"0": "None", "1": "Odd", "2": "Even"}.get(params.get("MODBUS_MASTER_SERIAL_PARITY", "0"), "None")
+    line = LineConfig(
+        params.get("MODBUS_MASTER_SERIAL_SPEED", 38400),
+        parity,
+        params.get("MODBUS_MASTER_SERIAL_STOPBITS", 1),
+        int(params.get("MODBUS_MASTER_SERIAL_DATABITS", DATA_BITS)),
+    )
+    model = TimingModel(
+        line,
+        after_transmit=int(params.get("MODBUS_MASTER_TIME_AFTER_TRANSMIT", 0)) / 1000.0,
+        inter_frame=int(params.get("MODBUS_MASTER_TIME_INTER_FRAME", 0)) / 1000.0,
+        timeout=int(params.get("MODBUS_MASTER_TIME_OUT_RECEIPT", 1000)) / 1000.0,
+    )
+    return model, polls
+
+
+def measure_capture(path, line):
+    """Utilisasi terukur dari capture: air-time semua frame dibagi durasi capture."""
+    import modbus_capture
+
+    frames = 0
+    nbytes = 0
+    requests = {}
+    first = last = None
+    for frame in modbus_capture.iter_capture_frames(path, line.baudrate):
+        frames += 1
+        nbytes += len(frame.data)
+        if first is None:
+            first = frame.start
+        last = frame.end
+        info = modbus_capture.decode_frame(frame.data)
+        if info["kind"] == "request":
+            key = (info["slave"], info["function"], info.get("address"))
+            requests[key] = requests.get(key, 0) + 1
+    duration = (last - first) if frames else 0.0
+    return {
+        "duration": duration,
+        "frames": frames,
+        "bytes": nbytes,
+        "wire": line.air_time(nbytes) / duration if duration else 0.0,
+        "requests": requests,
+    }
+
+
+def _parse_poll(text):
+    """'FC:ADDR[:COUNT][@HZ]' atau 'SLAVE/FC:ADDR...' -> Poll."""
+    spec, _, rate = text.partition("@")
+    slave = 1
+    if "/" in spec:
+        slave, _, spec = spec.partition("/")
+    parts = spec.split(":")
+    function = int(parts[0], 0)
+    address = int(parts[1], 0)
+    count = int(parts[2], 0) if len(parts) > 2 else 1
+    return Poll(int(slave), function, address, count, float(rate) if rate else None)
+
+
+def _print_polls(model, polls):
+    print(f"Jalur: {model.line}, t3.5 = {model.line.t35 * 1000:.3f} ms")
+    print(f"{'poll':26s} {'req':>4s} {'resp':>4s} {'air ms':>8s} {'transaksi ms':>13s} {'maks Hz':>8s}")
+    for p in polls:
+        req, resp = frame_sizes(p.function, p.count)
+        name = f"slave {p.slave} fc {p.function:02X} 0x{p.address:04X}x{p.count}"
+        print(f"{name:26s} {req:4d} {resp:4d} {model.wire_time(p) * 1000:8.3f} "
+              f"{model.transaction_time(p) * 1000:13.3f} {model.max_rate(p):8.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Model timing dan kapasitas bus Modbus RTU.")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    p_clp = sub.add_parser("clp", help="Model konfigurasi ClassicLadder (custom.clp)")
+    p_clp.add_argument("path", nargs="?", default="custom.clp")
+
+    p_cap = sub.add_parser("capture", help="Utilisasi terukur dari capture vs prediksi")
+    p_cap.add_argument("path")
+    p_cap.add_argument("--clp", default="custom.clp", help="Konfigurasi master untuk prediksi")
+
+    p_capa = sub.add_parser("capacity", help="Berapa drive muat di satu jalur")
+    p_capa.add_argument("--poll", action="append", required=True,
+                        help="Poll per drive: FC:ADDR[:COUNT]@HZ, mis. 3:0x0108:1@10")
+    p_capa.add_argument("--turnaround", type=float, default=2.0, help="Waktu proses slave (ms)")
+    p_capa.add_argument("--after-transmit", type=float, default=0.0, help="Jeda master setelah kirim (ms)")
+    p_capa.add_argument("--inter-frame", type=float, default=0.0, help="Jeda master antar request (ms)")
+    p_capa.add_argument("--headroom", type=float, default=0.7, help="Batas occupancy yang direncanakan")
+
+    for p in (p_cap, p_capa):
+        p.add_argument("--baud", type=int, default=38400)
+        p.add_argument("--parity", default="Even", choices=["None", "Even", "Odd"])
+        p.add_argument("--stopbits", type=float, default=1)
+
+    args = parser.parse_args(argv)
+
+    if args.mode == "clp":
+        model, polls = parse_clp(args.path)
+        _print_polls(model, polls)
+        cycle = model.cycle_time(polls)
+        silent = sum(model.transaction_time(p, responded=False) for p in polls)
+        print(f"\nSatu putaran {len(polls)} request: {cycle * 1000:.1f} ms ({1 / cycle:.2f} putaran/s)")
+        print(f"Jika slave tidak menjawab: {silent * 1000:.1f} ms per putaran")
+        wire = sum(model.wire_time(p) for p in polls) / cycle
+        print(f"Utilisasi kabel {wire * 100:.2f} %, sisanya jeda master dan turnaround")
+
+    elif args.mode == "capture":
+        line = LineConfig(args.baud, args.parity, args.stopbits)
+        measured = measure_capture(args.path, line)
+        print(f"Jalur: {line}")
+        print(f"Capture {measured['duration']:.3f} s, {measured['frames']} frame, {measured['bytes']} byte")
+        print(f"Utilisasi kabel terukur: {measured['wire'] * 100:.3f} %")
+        model, _ = parse_clp(args.clp)
+        model.line = line
+        polls = []
+        for (slave, function, address), n in sorted(measured["requests"].items()):
+            rate = n / measured["duration"] if measured["duration"] else 0.0
+            print(f"  slave {slave} fc {function:02X} 0x{address:04X}: {n} request, {rate:.3f} Hz")
+            polls.extend([Poll(slave, function, address, 1)] * n)
+        if polls and measured["duration"]:
+            # Master mengirim round-robin: laju request total = 1 / rata-rata waktu transaksi
+            answered = len(polls) / sum(model.transaction_time(p) for p in polls)
+            silent = len(polls) / sum(model.transaction_time(p, responded=False) for p in polls)
+            print(f"Laju request terukur {len(polls) / measured['duration']:.3f} Hz; prediksi "
+                  f"{answered:.2f} Hz jika dijawab, {silent:.3f} Hz jika slave diam ({args.clp})")
+
+    else:
+        line = LineConfig(args.baud, args.parity, args.stopbits)
+        model = TimingModel(line, args.turnaround / 1000.0, args.after_transmit / 1000.0, args.inter_frame / 1000.0)
+        polls = [_parse_poll(text) for text in args.poll]
+        _print_polls(model, polls)
+        wire, occupancy = model.utilisation(polls)
+        print(f"\nPer drive: kabel {wire * 100:.2f} %, occupancy {occupancy * 100:.2f} %")
+        drives = model.max_drives(polls, args.headroom)
+        print(f"Maksimum drive per jalur pada occupancy {args.headroom * 100:.0f} %: {drives}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,576 @@
+"""
+Lapisan transport Modbus yang bisa diganti: serial RTU, Modbus TCP, dan RTU-over-TCP.
+
+Semua transport punya antarmuka yang sama:
+
+    transact(slave_id, pdu) -> pdu respons   (function code + data, tanpa CRC/MBAP)
+    read_registers(slave_id, fc, alamat, n)  jalur cepat FC03/04 -> tuple nilai register
+    write(adu)                               kirim frame RTU mentah, respons-nya dibuang
+    open() / close() / is_open
+
+Alamat port ditulis sebagai URL:
+
+    /dev/ttyUSB1 atau serial:///dev/ttyUSB1?baud=38400&parity=Even&stopbits=1
+    tcp://192.168.1.50:502           Modbus TCP (MBAP, beberapa transaksi sekaligus)
+    rtu+tcp://192.168.1.50:4001      frame RTU mentah lewat gateway serial-ke-Ethernet
+
+Koneksi jaringan disimpan di `POOL` dan dipakai ulang; jika koneksi putus,
+transaksi berikutnya otomatis menyambung ulang.
+
+Pasang `modbus_journal.Journal` ke atribut `journal` transport untuk mencatat
+setiap frame kirim/terima beserta latensinya.
+"""
+import inspect
+import itertools
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from urllib.parse import urlparse, parse_qs
+
+from modbus_codec import FrameCodec, crc_ok, pack_pdu, unpack_registers
+from modbus_core import ModbusException, ModbusExceptionResponse
+from modbus_journal import RX, TX
+import modbus_core
+
+MODBUS_TCP_PORT = 502
+RTU_OVER_TCP_PORT = 4001
+
+_MBAP = struct.Struct('>HHHB')
+
+
+def check_rtu_response(response, slave_id):
+    """
+    Validasi CRC dan slave id, lalu kembalikan PDU respons sebagai memoryview
+    (tanpa menyalin) di atas `response`.
+    """
+    if not response:
+        raise ModbusException("Tidak ada respons dari driver.")
+
+    view = memoryview(response)
+    if not crc_ok(view):
+        raise ModbusException("CRC respons tidak valid.")
+
+    if view[0] != slave_id:
+        raise ModbusException("Slave ID respons tidak cocok.")
+
+    return view[1:-2]
+
+
+def decode_read_response(pdu, function_code, count):
+    """PDU respons FC03/04 -> tuple nilai register; exception Modbus dinaikkan."""
+    if pdu[0] & 0x80:
+        raise ModbusExceptionResponse(pdu[1])
+    if pdu[0] != function_code:
+        raise ModbusException("Function code respons tidak cocok.")
+    if len(pdu) != 2 + 2 * count or pdu[1] != 2 * count:
+        raise ModbusException("Panjang respons baca register tidak valid.")
+    return unpack_registers(pdu)
+
+
+def rtu_response_length(header):
+    """Panjang total ADU respons RTU dari 3 byte pertamanya, None jika tidak diketahui."""
+    function_code = header[1]
+    if function_code & 0x80:
+        return 5
+    if function_code in (0x01, 0x02, 0x03, 0x04):
+        return 3 + header[2] + 2
+    if function_code in (0x05, 0x06, 0x0F, 0x10):
+        return 8
+    return None
+
+
+def rtu_request_length(header):
+    """Panjang total ADU request RTU dari 7 byte pertamanya, None jika tidak diketahui."""
+    function_code = header[1]
+    if function_code in (0x01, 0x02, 0x03, 0x04, 0x05, 0x06):
+        return 8
+    if function_code in (0x0F, 0x10):
+        return 9 + header[6] if len(header) >= 7 else None
+    return None
+
+
+def _recv_exact(sock, size):
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError("Koneksi ditutup oleh remote.")
+        buf += chunk
+    return bytes(buf)
+
+
+def _recv_into(sock, view):
+    """Mengisi `view` penuh dari socket tanpa membuat buffer baru."""
+    got = 0
+    size = len(view)
+    while got < size:
+        n = sock.recv_into(view[got:])
+        if not n:
+            raise ConnectionError("Koneksi ditutup oleh remote.")
+        got += n
+
+
+class Transport:
+    """Antarmuka dasar transport."""
+
+    verbose = False
+    # UtilisationMeter opsional (modbus_timing.py) untuk mengukur pemakaian bus live
+    meter = None
+    # Journal opsional (modbus_journal.py) untuk jejak audit semua frame
+    journal = None
+
+    @property
+    def is_open(self):
+        raise NotImplementedError
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def transact(self, slave_id, pdu):
+        raise NotImplementedError
+
+    def read_registers(self, slave_id, function_code, address, count):
+        """Baca `count` register FC03/04 -> tuple nilai unsigned 16-bit."""
+        pdu = self.transact(slave_id, pack_pdu(function_code, address, count))
+        return decode_read_response(pdu, function_code, count)
+
+    def write(self, adu):
+        raise NotImplementedError
+
+
+class SerialRtuTransport(Transport):
+    """Modbus RTU di atas objek `serial.Serial` (perilaku sama dengan GUI lama)."""
+
+    verbose = True
+
+    def __init__(self, ser):
+        self.ser = ser
+        self.lock = threading.Lock()
+        self.codec = FrameCodec()
+
+    @property
+    def is_open(self):
+        return self.ser.is_open
+
+    def open(self):
+        if not self.ser.is_open:
+            self.ser.open()
+
+    def close(self):
+        if self.ser.is_open:
+            self.ser.close()
+
+    def _exchange(self, adu):
+        if self.verbose:
+            print(f"Sending Modbus Frame: {adu.hex().upper()}") # Print message for debugging
+        journal = self.journal
+        started = time.monotonic()
+        self.ser.reset_input_buffer()
+        self.ser.reset_output_buffer()
+        self.ser.write(adu)
+        if journal is not None:
+            journal.record(TX, adu, now=started)
+
+        # Waktu tunggu untuk respons, bisa disesuaikan
+        time.sleep(modbus_core.RESPONSE_WAIT)
+
+        response = self.ser.read(self.ser.in_waiting)
+        if response:
+            # Respons panjang (mis. FC03 125 register ~73 ms di 38400) belum tentu
+            # lengkap setelah RESPONSE_WAIT; baca sisanya sampai panjang yang diharapkan
+            if len(response) < 3:
+                response += self.ser.read(3 - len(response))
+            length = rtu_response_length(response) if len(response) >= 3 else None
+            if length is not None and len(response) < length:
+                response += self.ser.read(length - len(response))
+        if self.meter is not None or journal is not None:
+            elapsed = time.monotonic() - started
+            if self.meter is not None:
+                self.meter.record(len(adu), len(response), elapsed)
+            if journal is not None:
+                journal.record(RX, response, elapsed, now=started + elapsed)
+        return response
+
+    def transact(self, slave_id, pdu):
+        # Respons dari pyserial selalu objek baru, jadi PDU boleh berupa view di atasnya
+        with self.lock:
+            response = self._exchange(self.codec.encode_pdu(slave_id, pdu))
+        return check_rtu_response(response, slave_id)
+
+    def read_registers(self, slave_id, function_code, address, count):
+        with self.lock:
+            response = self._exchange(self.codec.encode(slave_id, function_code, address, count))
+        return decode_read_response(check_rtu_response(response, slave_id), function_code, count)
+
+    def write(self, adu):
+        with self.lock:
+            self.ser.write(adu)
+            if self.journal is not None:
+                self.journal.record(TX, adu)
+
+
+class RtuOverTcpTransport(Transport):
+    """
+    Frame RTU mentah (dengan CRC) lewat socket TCP ke gateway serial-ke-Ethernet.
+
+    Bus di belakang gateway tetap half-duplex, jadi hanya satu transaksi
+    yang berjalan pada satu waktu.
+    """
+
+    def __init__(self, host, port=RTU_OVER_TCP_PORT, timeout=1.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.sock = None
+        self.closed = True
+        self.lock = threading.Lock()
+        self.codec = FrameCodec()
+
+    @property
+    def is_open(self):
+        return not self.closed
+
+    def open(self):
+        with self.lock:
+            self.closed = False
+            if self.sock is None:
+                self._connect()
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self._drop()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = sock
+
+    def _drop(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+    def _exchange(self, adu):
+        """Kirim ADU lalu baca respons langsung ke buffer terima codec (view, dipakai ulang)."""
+        if self.sock is None:
+            self._connect()
+        self.sock.sendall(adu)
+        rx = self.codec.rx_view
+        _recv_into(self.sock, rx[:3])
+        length = rtu_response_length(rx)
+        if length is None:
+            # Panjang sisa respons tidak diketahui; buang koneksi agar transaksi berikutnya tidak bergeser
+            self._drop()
+            raise ModbusException(f"Function code respons tidak dikenal: {rx[1]}")
+        _recv_into(self.sock, rx[3:length])
+        return rx[:length]
+
+    def _transact_adu(self, adu):
+        """Satu transaksi di bawah self.lock; hasilnya valid sampai transaksi berikutnya."""
+        if self.closed:
+            raise ModbusException("Transport sudah ditutup.")
+        journal = self.journal
+        started = time.monotonic()
+        if journal is not None:
+            journal.record(TX, adu, now=started)
+        try:
+            response = self._exchange(adu)
+        except socket.timeout:
+            # Sisa respons yang telat bisa merusak transaksi berikutnya
+            self._drop()
+            if journal is not None:
+                journal.record(RX, b"", time.monotonic() - started)
+            raise ModbusException("Tidak ada respons dari driver.")
+        except OSError:
+            # Koneksi basi: sambung ulang sekali lalu ulangi
+            self._drop()
+            try:
+                response = self._exchange(adu)
+            except OSError as e:
+                self._drop()
+                raise ModbusException(f"Gateway {self.host}:{self.port} tidak terjangkau: {e}")
+        if self.meter is not None or journal is not None:
+            elapsed = time.monotonic() - started
+            if self.meter is not None:
+                self.meter.record(len(adu), len(response), elapsed)
+            if journal is not None:
+                journal.record(RX, response, elapsed, now=started + elapsed)
+        return response
+
+    def transact(self, slave_id, pdu):
+        with self.lock:
+            response = self._transact_adu(self.codec.encode_pdu(slave_id, pdu))
+            # Buffer terima dipakai ulang, jadi PDU disalin sebelum lock dilepas
+            return bytes(check_rtu_response(response, slave_id))
+
+    def read_registers(self, slave_id, function_code, address, count):
+        with self.lock:
+            response = self._transact_adu(self.codec.encode(slave_id, function_code, address, count))
+            return decode_read_response(check_rtu_response(response, slave_id), function_code, count)
+
+    def write(self, adu):
+        with self.lock:
+            try:
+                if self.sock is None:
+                    self._connect()
+                self.sock.sendall(adu)
+                if self.journal is not None:
+                    self.journal.record(TX, adu)
+            except OSError as e:
+                self._drop()
+                raise ModbusException(f"Gateway {self.host}:{self.port} tidak terjangkau: {e}")
+            if adu[0] != 0:
+                self._discard_reply()
+
+    def _discard_reply(self):
+        """
+        Membaca dan membuang respons frame mentah dari write(). Jika tertinggal
+        di socket, respons itu terbaca sebagai jawaban transact() berikutnya.
+        """
+        started = time.monotonic()
+        rx = self.codec.rx_view
+        try:
+            _recv_into(self.sock, rx[:3])
+            length = rtu_response_length(rx)
+            if length is None:
+                raise ModbusException(f"Function code respons tidak dikenal: {rx[1]}")
+            _recv_into(self.sock, rx[3:length])
+        except (OSError, ModbusException):
+            # Tidak dijawab atau tidak bisa diframing: koneksi baru lebih aman daripada sisa byte
+            self._drop()
+            return
+        if self.journal is not None:
+            self.journal.record(RX, rx[:length], time.monotonic() - started)
+
+
+class TcpTransport(Transport):
+    """
+    Modbus TCP dengan header MBAP.
+
+    Setiap request diberi transaction id, dan satu thread pembaca mencocokkan
+    respons ke request yang menunggu. Karena itu banyak thread (atau banyak
+    `submit()` dari satu thread) bisa punya transaksi yang berjalan bersamaan.
+    """
+
+    def __init__(self, host, port=MODBUS_TCP_PORT, timeout=1.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.sock = None
+        self.closed = True
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.send_lock = threading.Lock()
+        self.tids = itertools.count(1)
+        # Buffer kirim MBAP dipakai ulang di bawah send_lock
+        self.tx = bytearray(_MBAP.size + 256)
+        self.tx_view = memoryview(self.tx)
+
+    @property
+    def is_open(self):
+        return not self.closed
+
+    def open(self):
+        with self.lock:
+            self.closed = False
+            if self.sock is None:
+                self._connect()
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            sock = self.sock
+        if sock is not None:
+            self._drop(sock, ModbusException("Transport ditutup."))
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # Thread pembaca memblok tanpa batas waktu; timeout diurus per transaksi
+        sock.settimeout(None)
+        self.sock = sock
+        threading.Thread(target=self._reader, args=(sock,), daemon=True).start()
+        return sock
+
+    def _drop(self, sock, error):
+        """Menutup koneksi dan menggagalkan semua transaksi yang masih menunggu."""
+        with self.lock:
+            if self.sock is sock:
+                self.sock = None
+            pending, self.pending = self.pending, {}
+        try:
+            sock.close()
+        except OSError:
+            pass
+        for fut in pending.values():
+            if not fut.done():
+                fut.set_exception(error)
+
+    def _reader(self, sock):
+        header = bytearray(_MBAP.size)
+        header_view = memoryview(header)
+        try:
+            while True:
+                _recv_into(sock, header_view)
+                tid, _, length, unit = _MBAP.unpack_from(header)
+                if length < 2:
+                    # Tanpa function code; respons kosong tidak boleh sampai ke pemanggil
+                    raise ConnectionError(f"Panjang MBAP tidak valid: {length}")
+                # PDU diserahkan ke thread lain lewat Future, jadi harus objek sendiri
+                pdu = _recv_exact(sock, length - 1)
+                with self.lock:
+                    fut = self.pending.pop(tid, None)
+                journal = self.journal
+                if journal is not None:
+                    now = time.monotonic()
+                    sent = getattr(fut, "sent", now)
+                    journal.record_pdu(RX, unit, pdu, now - sent, now=now)
+                if fut is not None and not fut.done():
+                    fut.set_result((unit, pdu))
+        except OSError as e:
+            self._drop(sock, ModbusException(f"Koneksi ke {self.host}:{self.port} terputus: {e}"))
+
+    def _send(self, tid, slave_id, pdu, fut=None):
+        with self.lock:
+            if self.closed:
+                raise ModbusException("Transport sudah ditutup.")
+            sock = self.sock or self._connect()
+            if fut is not None:
+                self.pending[tid] = fut
+        size = _MBAP.size + len(pdu)
+        with self.send_lock:
+            _MBAP.pack_into(self.tx, 0, tid, 0, len(pdu) + 1, slave_id)
+            self.tx[_MBAP.size:size] = pdu
+            sent = time.monotonic()
+            if fut is not None:
+                fut.sent = sent
+            # Dicatat sebelum dikirim: thread pembaca bisa mencatat respons lebih dulu
+            if self.journal is not None:
+                self.journal.record_pdu(TX, slave_id, pdu, now=sent)
+            sock.sendall(self.tx_view[:size])
+        return sock
+
+    def submit(self, slave_id, pdu):
+        """Mengirim request tanpa menunggu; hasilnya Future berisi (unit, pdu)."""
+        tid = next(self.tids) & 0xFFFF
+        fut = Future()
+        fut.tid = tid
+        try:
+            self._send(tid, slave_id, pdu, fut)
+        except OSError:
+            # Koneksi basi: sambung ulang sekali lalu ulangi
+            if self.sock is not None:
+                self._drop(self.sock, ModbusException("Koneksi diputus untuk reconnect."))
+            fut = Future()
+            fut.tid = tid
+            try:
+                self._send(tid, slave_id, pdu, fut)
+            except OSError as e:
+                raise ModbusException(f"Server {self.host}:{self.port} tidak terjangkau: {e}")
+        return fut
+
+    def transact(self, slave_id, pdu):
+        fut = self.submit(slave_id, pdu)
+        try:
+            unit, response = fut.result(self.timeout)
+        except FutureTimeout:
+            with self.lock:
+                self.pending.pop(fut.tid, None)
+            if self.journal is not None:
+                self.journal.record_pdu(RX, slave_id, b"", time.monotonic() - fut.sent)
+            raise ModbusException("Tidak ada respons dari driver.")
+        if unit != slave_id:
+            raise ModbusException("Slave ID respons tidak cocok.")
+        return response
+
+    def write(self, adu):
+        """Frame RTU dari GUI dikirim sebagai MBAP; respons-nya diabaikan."""
+        view = memoryview(adu)
+        tid = next(self.tids) & 0xFFFF
+        try:
+            self._send(tid, view[0], view[1:-2])
+        except OSError as e:
+            raise ModbusException(f"Server {self.host}:{self.port} tidak terjangkau: {e}")
+
+
+def create_transport(url, baudrate=38400, parity="Even", stopbits=1, timeout=1.0):
+    """Membuat transport baru dari URL (lihat docstring modul)."""
+    if "://" not in url:
+        return SerialRtuTransport(modbus_core.open_serial(url, baudrate, parity, stopbits, timeout))
+
+    parsed = urlparse(url)
+    query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+    timeout = float(query.get("timeout", timeout))
+
+    if parsed.scheme == "serial":
+        ser = modbus_core.open_serial(
+            parsed.path,
+            baudrate=query.get("baud", baudrate),
+            parity=query.get("parity", parity),
+            stopbits=query.get("stopbits", stopbits),
+            timeout=timeout
+        )
+        return SerialRtuTransport(ser)
+    if parsed.scheme == "tcp":
+        return TcpTransport(parsed.hostname, parsed.port or MODBUS_TCP_PORT, timeout)
+    if parsed.scheme == "rtu+tcp":
+        return RtuOverTcpTransport(parsed.hostname, parsed.port or RTU_OVER_TCP_PORT, timeout)
+    raise ValueError(f"Skema transport tidak didukung: {parsed.scheme}")
+
+
+class TransportPool:
+    """
+    Menyimpan satu transport persisten per URL dan memakainya ulang.
+
+    Satu URL hanya bisa punya satu setting (port serial tidak bisa dibuka dua
+    kali); meminta URL yang sama dengan baud/parity/timeout berbeda selagi
+    transport lama masih terbuka adalah error. Transport yang sudah ditutup
+    (mis. GUI disconnect lalu ganti baud) diganti dengan yang baru.
+    """
+
+    def __init__(self):
+        self.transports = {}
+        self.options = {}
+        self.lock = threading.Lock()
+
+    def get(self, url, **options):
+        # Opsi dinormalisasi dengan default create_transport agar {} == {baudrate: 38400}
+        bound = inspect.signature(create_transport).bind(url, **options)
+        bound.apply_defaults()
+        settings = dict(bound.arguments)
+        with self.lock:
+            transport = self.transports.get(url)
+            if transport is not None and self.options[url] != settings:
+                if transport.is_open:
+                    raise ModbusException(f"{url} sudah dibuka dengan setting lain: {self.options[url]}")
+                transport = None
+            if transport is None:
+                transport = create_transport(url, **options)
+                self.transports[url] = transport
+                self.options[url] = settings
+        transport.open()
+        return transport
+
+    def close_all(self):
+        with self.lock:
+            transports, self.transports = list(self.transports.values()), {}
+            self.options = {}
+        for transport in transports:
+            transport.close()
+
+
+POOL = TransportPool()
+
+
+def open_transport(url, **options):
+    """Mengambil transport dari pool global (menyambung jika perlu)."""
+    return POOL.get(url, **options)